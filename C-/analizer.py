@@ -1,13 +1,15 @@
 from globalTypes import TokenType, TreeNode, VarType, operation_operators, comparison_operators
 from enum import Enum
+from diagnostics import emit
 
 MAXCHILDREN = 3  # adjust as needed
-scope_stack = []  # Stack of symbol tables (dicts)
+scope_stack = []  # Stack of symbol tables (dicts keyed by symbol id)
 location_counter = 0  # Memory address counter for variables
 current_function = None  # Track current function name
 scope_info = {}  # Store scope information in a hashtable
 ERROR = False  # Global error flag
 error_message = []  # Error message for debugging
+symbols = None  # Tabla de identificadores del programa (SymbolTable), ver semantica_inicio
 
 
 def scope_push():
@@ -60,7 +62,7 @@ def st_insert(name, lineno, loc, var_type=None):
     """Funcion para insertar una variable en la tabla de simbolos del scope actual
 
     Args:
-        name (str): Nombre de la variable
+        name (int): Identificador de la variable en 'symbols'
         lineno (int): Linea donde se declara la variable
         loc (int): Ubicacion en memoria
         var_type (VarType, optional): Tipo de la variable. Defaults to None.
@@ -83,7 +85,7 @@ def st_add(name, lineno, loc):
     """Funcion para agregar una referencia a una variable existente
 
     Args:
-        name (str): Nombre de la variable
+        name (int): Identificador de la variable en 'symbols'
         lineno (int): Linea donde se usa la variable
         loc (int): Ubicacion en memoria
 
@@ -101,14 +103,14 @@ def st_add(name, lineno, loc):
                        "type": VarType(global_val['type'].type, global_val['type'].size)}
     else:
         table[name] = {"lines": [lineno],
-                       "type": create_error(name, lineno, "no definida")}
+                       "type": create_error(symbols.name(name), lineno, "no definida")}
 
 
 def st_lookup(name, index=None):
     """Funcion para buscar una variable en la tabla de simbolos
 
     Args:
-        name (str): Nombre de la variable a buscar
+        name (int): Identificador de la variable a buscar en 'symbols'
         index (int, optional): Indice del scope donde buscar. Defaults to None.
 
     Returns:
@@ -160,7 +162,7 @@ def checking_function_params(node):
         for child in children.child:
             if len(child.child) == 1:
                 pass
-            elif child.child[1].child:
+            elif child.child[1].type == "arr":
                 params_arr.append("arr")
             else:
                 params_arr.append(child.child[0].lexema)
@@ -193,13 +195,15 @@ def get_node_type(node):
     child = node.child[0] if node.child else None
     nex_child = node.child[1] if child and len(node.child) > 1 else None
 
-    if nex_child and nex_child.token == TokenType.VARIABLE and nex_child.child:
+    if nex_child and nex_child.token == TokenType.VARIABLE and nex_child.type == "arr":
+        # El tamaño es el hijo del nodo; un parámetro arreglo no tiene tamaño
         size = None
-        if nex_child.child[0].token == TokenType.ENTERO:
-            size = int(nex_child.child[0].lexema)
-        elif nex_child.child[0].token == TokenType.ID:
-            if st_lookup(nex_child.child[0].lexema):
-                size = nex_child.child[0].lexema
+        length = nex_child.child[0] if nex_child.child else None
+        if length is not None and length.token == TokenType.ENTERO:
+            size = int(length.lexema)
+        elif length is not None and length.token == TokenType.ID:
+            if st_lookup(length.symbol):
+                size = length.lexema
 
         return VarType("arr", size)
     if child.token == TokenType.INT:
@@ -207,7 +211,7 @@ def get_node_type(node):
     elif child.token == TokenType.VOID:
         return VarType("void", None)
 
-    resp = st_lookup(node.lexema, index=0)
+    resp = st_lookup(node.symbol, index=0)
     if resp:
         return VarType(resp['type'].type, resp['type'].size)
 
@@ -260,7 +264,7 @@ def traverse(t, preProc, postProc):
                 printing_errors(current_function, "Error de tipado")
 
             else:
-                print(
+                emit(
                     f"Revisión de tipos '{current_function}' procesado de forma exitosa.")
         else:
             printing_errors(current_function, "Error semantico")
@@ -280,10 +284,10 @@ def printing_errors(current_function, error_type):
     """
     global error_message
     if error_message:
-        print(f"\n{error_type} en la función '{current_function}':")
-        print(20*"-")
-        print(error_message[0])
-        print(20*"-")
+        emit(f"\n{error_type} en la función '{current_function}':")
+        emit(20*"-")
+        emit(error_message[0])
+        emit(20*"-")
 
         error_message = []
 
@@ -304,18 +308,18 @@ def insertNode(t):
 
         # Variable declaration
         if (left_children_token == TokenType.INT and any(c.token == TokenType.VARIABLE for c in t.child)) or is_function_node(t):
-            st_lookup(t.lexema)
-            st_insert(t.lexema, t.line, location_counter, get_node_type(t))
+            st_lookup(t.symbol)
+            st_insert(t.symbol, t.line, location_counter, get_node_type(t))
             location_counter += 1
 
         # Function parameter
         elif left_children_token == TokenType.PARAMS:
-            st_lookup(t.lexema, index=0)
-            st_insert(t.lexema, t.line, location_counter, get_node_type(t))
+            st_lookup(t.symbol, index=0)
+            st_insert(t.symbol, t.line, location_counter, get_node_type(t))
             location_counter += 1
 
         else:
-            st_add(t.lexema, t.line, 0)
+            st_add(t.symbol, t.line, 0)
 
 
 def print_symbol_tables():
@@ -343,28 +347,29 @@ def print_symbol_tables():
         RESET = "\033[0m"
 
         # Title centered over full width
-        print(f"\n{title}\n")
+        emit(f"\n{title}\n")
 
-        print(top)
+        emit(top)
         # Header row
         hdr = "│" + "│".join(
             f" {headers[i].center(col_widths[i])} "
             for i in range(len(headers))
         ) + "│"
-        print(f"{BOLD}{hdr}{RESET}")
-        print(sep)
+        emit(f"{BOLD}{hdr}{RESET}")
+        emit(sep)
         # Data rows
         for row in rows:
-            print("│" + "│".join(
+            emit("│" + "│".join(
                 f" {row[i].ljust(col_widths[i])} "
                 for i in range(len(row))
             ) + "│")
-        print(bottom)
+        emit(bottom)
 
     # --- GLOBAL SCOPE ---
     # Build rows: [name, type, params, lines]
     global_rows = []
-    for name, data in scope_stack[0].items():
+    for symbol, data in scope_stack[0].items():
+        name = symbols.name(symbol)
         # lines
         lines_str = ', '.join(map(str, data['lines']))
         # type
@@ -386,7 +391,8 @@ def print_symbol_tables():
     # --- FUNCTION SCOPES ---
     for func_name, info in scope_info.items():
         func_rows = []
-        for name, data in info['scope'].items():
+        for symbol, data in info['scope'].items():
+            name = symbols.name(symbol)
             lines_str = ', '.join(map(str, data['lines']))
             vt = data.get('type')
             if vt:
@@ -473,10 +479,10 @@ def checking_types(node, scope):
 
     elif node.child:
         if node.child[0].token == TokenType.POSITION:
-            var_type = scope_info[scope]['scope'].get(node.lexema, None)
+            var_type = scope_info[scope]['scope'].get(node.symbol, None)
 
             if var_type is None:
-                var_type = scope_stack[0].get(node.lexema, None)
+                var_type = scope_stack[0].get(node.symbol, None)
                 if var_type is None:
                     create_error(node.lexema, node.line, "no está definida")
                     return False
@@ -504,7 +510,7 @@ def checking_types(node, scope):
         if node.child[0].token == TokenType.PARAMS and node.token != TokenType.FUNCTION:
 
             if node.child[0].child:
-                var_type = scope_stack[0].get(node.lexema, None)
+                var_type = scope_stack[0].get(node.symbol, None)
 
                 if len(node.child[0].child) != len(var_type['type'].params):
                     create_error(
@@ -523,7 +529,7 @@ def checking_types(node, scope):
 
                 return var_type['type']
             else:
-                var_type = scope_stack[0].get(node.lexema, None)
+                var_type = scope_stack[0].get(node.symbol, None)
                 if var_type['type'].params:
                     create_error(
                         node.lexema, node.line, "número inválido de parámetros")
@@ -539,9 +545,9 @@ def checking_types(node, scope):
                 return False
 
     elif node.token == TokenType.ID:
-        var_type = scope_info[scope]['scope'].get(node.lexema, None)
+        var_type = scope_info[scope]['scope'].get(node.symbol, None)
         if var_type is None:
-            var_type = scope_stack[0].get(node.lexema, None)
+            var_type = scope_stack[0].get(node.symbol, None)
             if var_type is None:
                 create_error(node.lexema, node.line, "no está definida")
                 return False
@@ -556,31 +562,44 @@ def checking_types(node, scope):
     return True
 
 
-def semantica(ast, imprime):
-    """Funcion principal para el analisis semantico
+def semantica_inicio(symbol_table):
+    """Funcion para iniciar el analisis semantico: crea el scope global con las funciones
+    predefinidas input y output
 
     Args:
-        ast (TreeNode): Arbol de sintaxis a analizar
-        imprime (bool): Flag para indicar si se deben imprimir las tablas de simbolos
+        symbol_table (SymbolTable): Tabla de identificadores del programa (Parser.symbols)
 
     Returns:
         None
     """
-    global ERROR
-    print("Iniciando análisis semántico...")
+    global symbols
+    symbols = symbol_table
+    emit("Iniciando análisis semántico...")
 
     def_input = VarType("int", None, [])
     def_output = VarType("void", None, ["int"])
 
     scope_push()
-    st_insert("input", -1, -1, def_input)
-    st_insert("output", -1, -1, def_output)
-    traverse(ast, insertNode, checking_types)
+    st_insert(symbols.intern("input"), -1, -1, def_input)
+    st_insert(symbols.intern("output"), -1, -1, def_output)
+
+
+def semantica_fin(imprime, check_main=True):
+    """Funcion para terminar el analisis semantico despues de la ultima declaracion
+
+    Args:
+        imprime (bool): Flag para indicar si se deben imprimir las tablas de simbolos
+        check_main (bool, optional): Flag para exigir la función int main(). Defaults to True.
+
+    Returns:
+        bool: True si hubo errores
+    """
+    global ERROR
 
     # Check if main is the last function and has correct return type
-    main_info = scope_stack[0].get("main", None)
-    if not main_info or main_info['type'].type != "int":
-        print("\nError: el programa debe terminar con una función int main()")
+    main_info = scope_stack[0].get(symbols.intern("main"), None)
+    if check_main and (not main_info or main_info['type'].type != "int"):
+        emit("\nError: el programa debe terminar con una función int main()")
         ERROR = True
 
     if imprime:
@@ -589,3 +608,44 @@ def semantica(ast, imprime):
     scope_pop()
 
     return ERROR
+
+
+def semantica(ast, imprime, symbol_table):
+    """Funcion principal para el analisis semantico
+
+    Args:
+        ast (TreeNode): Arbol de sintaxis a analizar
+        imprime (bool): Flag para indicar si se deben imprimir las tablas de simbolos
+        symbol_table (SymbolTable): Tabla de identificadores del programa (Parser.symbols)
+
+    Returns:
+        bool: True si hubo errores
+    """
+    semantica_inicio(symbol_table)
+    traverse(ast, insertNode, checking_types)
+
+    return semantica_fin(imprime)
+
+
+def semantica_stream(declarations, imprime, symbol_table, syntax_errors=()):
+    """Funcion para el analisis semantico declaracion por declaracion. C- exige declarar
+    antes de usar, así que cada declaración de nivel superior solo depende de las anteriores
+    (ya registradas en el scope global): se analiza en cuanto llega y después se libera, y la
+    memoria depende de la declaración más grande y no del programa completo.
+
+    Args:
+        declarations (iterable): Declaraciones de nivel superior, por ejemplo de Parser.declarations()
+        imprime (bool): Flag para indicar si se deben imprimir las tablas de simbolos
+        symbol_table (SymbolTable): Tabla de identificadores del programa (Parser.symbols)
+        syntax_errors (list, optional): Errores de sintaxis (Parser.errors), que se llenan
+            mientras llegan las declaraciones; si al final hay alguno, el programa quedó
+            incompleto y no se exige la función main. Defaults to ().
+
+    Returns:
+        bool: True si hubo errores
+    """
+    semantica_inicio(symbol_table)
+    for node in declarations:
+        traverse(node, insertNode, checking_types)
+
+    return semantica_fin(imprime, check_main=not syntax_errors)
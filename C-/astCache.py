@@ -0,0 +1,186 @@
+''' Caché en disco de los árboles sintácticos, indexada por el hash del programa y la versión del compilador '''
+
+import gc
+import hashlib
+import os
+import struct
+
+from globalTypes import AstArena, TreeNode
+from customParser import Parser
+from lexer import Lexer
+
+# Módulos que determinan el árbol que construye el analizador sintáctico y su formato en disco
+compiler_modules = ("globalTypes.py", "LexerStatesTable.py", "lexer.py",
+                    "customParser.py", "astCache.py")
+
+# Cada archivo de la caché es una secuencia de registros (longitud, AstArena.to_bytes): la
+# raíz del programa sin hijos y después cada declaración de nivel superior, en orden
+record = struct.Struct("<I")
+
+
+def compiler_version():
+    """Funcion para calcular la versión del compilador como el hash de sus módulos y del
+    formato de serialización, así que cualquier cambio en ellos invalida la caché
+
+    Returns:
+        str: Hash hexadecimal de la versión
+    """
+    digest = hashlib.sha256(b"%d" % AstArena.format_version)
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for module in compiler_modules:
+        with open(os.path.join(directory, module), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+version = compiler_version()
+
+
+def write_record(f, node):
+    data = AstArena.from_tree(node).to_bytes()
+    f.write(record.pack(len(data)))
+    f.write(data)
+
+
+class ParseCache:
+    """Directorio con los árboles ya analizados, serializados con AstArena.to_bytes. Un
+    programa sin cambios se carga del disco en lugar de volver a analizarlo.
+    """
+
+    def __init__(self, directory=".ast_cache"):
+        """
+        Args:
+            directory (str, optional): Directorio de la caché. Defaults to ".ast_cache".
+        """
+        self.directory = directory
+
+    def path(self, programa, abstract=False):
+        """Archivo del árbol del programa: el hash del programa, la versión y el modo"""
+        digest = hashlib.sha256(version.encode())
+        digest.update(b"abstract" if abstract else b"concrete")
+        digest.update(programa.encode("utf-8"))
+        return os.path.join(self.directory, digest.hexdigest() + ".ast")
+
+    def load(self, programa, symbols, abstract=False):
+        """Funcion para cargar el árbol del programa de la caché
+
+        Args:
+            programa (str): Código fuente, sin el '$' final
+            symbols (SymbolTable): Tabla donde se internan los identificadores del árbol
+            abstract (bool, optional): Modo del árbol (ver Parser). Defaults to False.
+
+        Returns:
+            TreeNode | None: Raíz del árbol, o None si no está en la caché o el archivo no es válido
+        """
+        try:
+            with open(self.path(programa, abstract), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        # Igual que en AstArena.to_tree, el recolector de ciclos se pausa mientras se crean
+        # los nodos de todas las declaraciones
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            view = memoryview(data)
+            trees = []
+            offset = 0
+            while offset < len(data):
+                size, = record.unpack_from(data, offset)
+                offset += record.size
+                trees.append(AstArena.from_bytes(view[offset:offset + size], symbols).to_tree())
+                offset += size
+        except (ValueError, struct.error):
+            return None
+        finally:
+            if enabled:
+                gc.enable()
+
+        if not trees:
+            return None
+        root = trees[0]
+        root.child = trees[1:]
+        return root
+
+    def store(self, programa, root, abstract=False):
+        """Funcion para guardar el árbol del programa en la caché. Se escribe en un archivo
+        temporal que luego se renombra, para que otro proceso nunca lea un archivo a medias.
+
+        Args:
+            programa (str): Código fuente, sin el '$' final
+            root (TreeNode): Raíz del árbol
+            abstract (bool, optional): Modo del árbol (ver Parser). Defaults to False.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(programa, abstract)
+        temporal = f"{path}.{os.getpid()}.tmp"
+        with open(temporal, "wb") as f:
+            write_record(f, TreeNode(token=root.token, lexema=root.lexema,
+                                     line=root.line, column=root.column))
+            for node in root.child:
+                write_record(f, node)
+        os.replace(temporal, path)
+
+    def stream(self, programa, parser):
+        """Generador para compilar declaración por declaración guardando el árbol en la caché:
+        entrega las declaraciones de parser.declarations(valid_only=True) en cuanto el
+        analizador las termina y las escribe en el archivo de la caché, que solo se conserva
+        si todo el programa se analizó sin errores de sintaxis.
+
+        Args:
+            programa (str): Código fuente, sin el '$' final
+            parser (Parser): Analizador sintáctico del programa, sin usar todavía
+
+        Yields:
+            TreeNode: Cada declaración de nivel superior
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(programa, parser.abstract)
+        temporal = f"{path}.{os.getpid()}.tmp"
+        complete = False
+
+        try:
+            with open(temporal, "wb") as f:
+                declarations = parser.declarations(valid_only=True)
+                # Al pedir la primera declaración el analizador crea la raíz, que va antes que todas
+                node = next(declarations, None)
+                write_record(f, parser.root)
+                if node is not None:
+                    write_record(f, node)
+                    yield node
+
+                for node in declarations:
+                    write_record(f, node)
+                    yield node
+
+            complete = not parser.errors
+
+        finally:
+            if complete:
+                os.replace(temporal, path)
+            else:
+                os.remove(temporal)
+
+    def parse(self, programa, symbols, abstract=False):
+        """Funcion para obtener el árbol del programa: de la caché si ya se analizó, o con
+        Parser en otro caso. Solo se guardan los árboles sin errores, así que los errores
+        siempre se vuelven a reportar.
+
+        Args:
+            programa (str): Código fuente, sin el '$' final
+            symbols (SymbolTable): Tabla donde se internan los identificadores del árbol
+            abstract (bool, optional): Modo del árbol (ver Parser). Defaults to False.
+
+        Returns:
+            tuple: (TreeNode raíz, lista de ErrorNode, vacía si no hay)
+        """
+        root = self.load(programa, symbols, abstract)
+        if root is not None:
+            return root, []
+
+        root, errors = Parser(Lexer(programa + '$', 0, len(programa), symbols=symbols),
+                              abstract=abstract).parser()
+        if not errors:
+            self.store(programa, root, abstract)
+        return root, errors
@@ -0,0 +1,376 @@
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from analizer import semantica, semantica_stream
+from astCache import ParseCache
+from globalTypes import AstArena, SymbolTable, TokenType, char_map, char_classes
+from customParser import IncrementalParser, Parser, parse_parallel
+from lexer import Lexer, def_globales, getToken, relex, tokenize_all, tokenize_parallel
+
+
+def generate_source(n_functions, header_lines=0):
+    """Genera un programa C- sintético con muchos identificadores largos
+
+    Args:
+        n_functions (int): Número de funciones a generar
+        header_lines (int, optional): Líneas del comentario de licencia antes de cada función. Defaults to 0.
+
+    Returns:
+        str: Código fuente del programa generado
+    """
+    licencia = "".join(f" * Linea {n} de la licencia del codigo generado automaticamente.\n"
+                       for n in range(header_lines))
+    funciones = []
+    for k in range(n_functions):
+        funciones.append(f"""/* funcion generada numero {k}
+{licencia} */
+int funcion_generada_{k}(int arreglo_entrada[], int limite_inferior, int limite_superior)
+{{ int indice_actual; int acumulador_total;
+  indice_actual = limite_inferior;
+  acumulador_total = 0;
+  while (indice_actual < limite_superior)
+    {{ if (arreglo_entrada[indice_actual] >= acumulador_total)
+        {{ acumulador_total = acumulador_total + arreglo_entrada[indice_actual]; }}
+      indice_actual = indice_actual + 1;
+    }}
+  return acumulador_total;
+}}
+""")
+    funciones.append("int main(void)\n{ return 0; }\n")
+    return "\n".join(funciones)
+
+
+def legacy_char_column(a):
+    """Clasificación lineal sobre char_map (la implementación previa a la tabla de clases)"""
+    for column, chars in char_map.items():
+        if a in chars:
+            return column
+    return len(char_map)
+
+
+def timed(func, *args, repeat=5):
+    """Ejecuta la función varias veces y regresa el mejor tiempo y su resultado"""
+    mejor = float("inf")
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        resultado = func(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def lex_all(programa):
+    """Tokeniza el programa completo con getToken y regresa el número de tokens"""
+    def_globales(programa + '$', 0, len(programa))
+    count = 0
+    token = None
+    while token != TokenType.ENDFILE:
+        token, _, _, _ = getToken(False)
+        count += 1
+    return count
+
+
+def lex_spans(programa):
+    """Tokeniza el programa completo con get_span (sin copiar lexemas)"""
+    lexer = Lexer(programa + '$', 0, len(programa))
+    count = 0
+    token = None
+    while token != TokenType.ENDFILE:
+        token, _, _ = lexer.get_span()
+        count += 1
+    return count
+
+
+def token_list(programa):
+    """Guarda todos los tokens como una lista de tuplas de getToken"""
+    def_globales(programa + '$', 0, len(programa))
+    tokens = [getToken(False)]
+    while tokens[-1][0] != TokenType.ENDFILE:
+        tokens.append(getToken(False))
+    return tokens
+
+
+def traced_memory(func, *args):
+    """Memoria (en bytes) que ocupa el resultado de la función"""
+    tracemalloc.start()
+    resultado = func(*args)
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del resultado
+    return memoria
+
+
+def peak_memory(func, *args):
+    """Memoria máxima (en bytes) que se usa mientras se ejecuta la función"""
+    tracemalloc.start()
+    func(*args)
+    memoria = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return memoria
+
+
+def bench_classification(programa):
+    legacy, _ = timed(lambda: [legacy_char_column(c) for c in programa])
+    table, _ = timed(lambda: programa.translate(char_classes).encode('latin-1'))
+    print(f"clasificación lineal:   {legacy:8.4f} s")
+    print(f"clasificación por tabla:{table:8.4f} s  ({legacy / table:.1f}x)")
+
+
+def bench_lexer(programa):
+    segundos, tokens = timed(lex_all, programa)
+    print(f"lexer DFA:              {segundos:8.4f} s  "
+          f"{tokens / segundos:12.0f} tokens/s  ({tokens} tokens)")
+    segundos, tokens = timed(lex_spans, programa)
+    print(f"lexer DFA (intervalos): {segundos:8.4f} s  "
+          f"{tokens / segundos:12.0f} tokens/s")
+
+
+def bench_tokenize_all(programa):
+    lista, tokens = timed(token_list, programa)
+    columnas, _ = timed(tokenize_all, programa)
+    memoria_lista = traced_memory(token_list, programa)
+    memoria_columnas = traced_memory(tokenize_all, programa)
+    print(f"lista de tuplas:        {lista:8.4f} s  {memoria_lista / len(tokens):8.1f} bytes/token")
+    print(f"tokenize_all:           {columnas:8.4f} s  {memoria_columnas / len(tokens):8.1f} bytes/token")
+
+
+def same_tokens(a, b):
+    return (a.kind == b.kind and a.start == b.start and a.end == b.end
+            and a.line == b.line and a.column == b.column)
+
+
+def compare_engines(programa):
+    """Verifica que todos los motores produzcan exactamente los mismos tokens que 'dfa'"""
+    dfa = tokenize_all(programa, engine="dfa")
+    for engine in Lexer.engines[1:]:
+        assert same_tokens(dfa, tokenize_all(programa, engine=engine)), \
+            f"el motor léxico '{engine}' no coincide con 'dfa'"
+    return len(dfa)
+
+
+def bench_engines(programa):
+    # Los casos límite de los motores están en test_lexer.py; aquí solo se verifica la entrada medida
+    tokens = compare_engines(programa)
+    for engine in Lexer.engines:
+        segundos, _ = timed(tokenize_all, programa, 0, None, engine, repeat=3)
+        print(f"motor {engine:17} {segundos:8.4f} s  "
+              f"{len(programa) / segundos / 1e6:8.2f} MB/s  {tokens / segundos:12.0f} tokens/s")
+
+
+def bench_comments(programa):
+    """Compara los motores sobre el mismo número de funciones con licencias de 200 líneas"""
+    comentado = generate_source(programa.count("/* funcion generada"), header_lines=200)
+    tokens = len(tokenize_all(comentado))
+    for engine in Lexer.engines:
+        segundos, _ = timed(tokenize_all, comentado, 0, None, engine, repeat=3)
+        print(f"comentarios {engine:11} {segundos:8.4f} s  "
+              f"{len(comentado) / segundos / 1e6:8.2f} MB/s  {tokens / segundos:12.0f} tokens/s")
+
+
+def bench_parallel(programa):
+    """Análisis en paralelo por fragmentos con 1, 2, 4, ... procesos (hasta os.cpu_count())"""
+    comentado = generate_source(programa.count("/* funcion generada"), header_lines=20)
+    chunk_size = max(len(comentado) // 16, 1)
+    esperado = tokenize_all(comentado)
+    assert same_tokens(esperado, tokenize_parallel(comentado, processes=2, chunk_size=chunk_size)), \
+        "tokenize_parallel no coincide con tokenize_all"
+    secuencial, _ = timed(tokenize_all, comentado, repeat=3)
+    print(f"secuencial              {secuencial:8.4f} s  {len(comentado) / secuencial / 1e6:8.2f} MB/s")
+    procesos = 1
+    while True:
+        segundos, _ = timed(tokenize_parallel, comentado, 0, None, "dfa", procesos, chunk_size, repeat=3)
+        print(f"paralelo {procesos:2} procesos    {segundos:8.4f} s  "
+              f"{len(comentado) / segundos / 1e6:8.2f} MB/s  ({secuencial / segundos:.2f}x)")
+        if procesos >= (os.cpu_count() or 1):
+            break
+        procesos *= 2
+
+
+def bench_relex(programa):
+    """Edición de un carácter a la mitad del programa: relex contra volver a analizar todo"""
+    stream = tokenize_all(programa)
+    offset = programa.index("acumulador_total", len(programa) // 2)
+    editado = programa[:offset] + "x" + programa[offset:]
+    assert same_tokens(relex(stream, offset, 0, "x"), tokenize_all(editado)), \
+        "relex no coincide con tokenize_all"
+    completo, _ = timed(tokenize_all, editado)
+    incremental, _ = timed(relex, stream, offset, 0, "x")
+    print(f"tokenize_all (editado): {completo:8.4f} s")
+    print(f"relex:                  {incremental:8.4f} s  ({completo / incremental:.0f}x)")
+
+
+def parse_all(programa):
+    """Analiza sintácticamente el programa completo y regresa el número de nodos de la raíz"""
+    raiz, errors = Parser(Lexer(programa + '$', 0, len(programa))).parser()
+    assert not errors, "el programa generado no debe tener errores"
+    return len(raiz.child)
+
+
+def parse_stream(stream):
+    raiz, _ = Parser(stream.reader()).parser()
+    return len(raiz.child)
+
+
+def bench_parser(programa):
+    tokens = len(tokenize_all(programa))
+    segundos, _ = timed(parse_all, programa, repeat=3)
+    print(f"léxico + sintáctico:    {segundos:8.4f} s  {tokens / segundos:12.0f} tokens/s")
+    stream = tokenize_all(programa)
+    segundos, _ = timed(parse_stream, stream, repeat=3)
+    print(f"sintáctico (TokenStream):{segundos:7.4f} s  {tokens / segundos:12.0f} tokens/s")
+
+
+def bench_parser_parallel(programa):
+    """Análisis sintáctico en paralelo por declaraciones con 1, 2, 4, ... procesos (hasta os.cpu_count())"""
+    stream = tokenize_all(programa)
+    secuencial, _ = timed(parse_stream, stream, repeat=3)
+    print(f"sintáctico secuencial   {secuencial:8.4f} s")
+    procesos = 1
+    while True:
+        segundos, _ = timed(parse_parallel, stream, procesos, repeat=3)
+        print(f"paralelo {procesos:2} procesos    {segundos:8.4f} s  ({secuencial / segundos:.2f}x)")
+        if procesos >= (os.cpu_count() or 1):
+            break
+        procesos *= 2
+
+
+def count_ids(raiz):
+    """Cuenta los nodos ID recorriendo el árbol de TreeNode con una pila"""
+    count = 0
+    stack = [raiz]
+    while stack:
+        node = stack.pop()
+        if node is not None:
+            count += node.token == TokenType.ID
+            stack.extend(getattr(node, "child", ()))
+    return count
+
+
+def count_ids_arena(arena):
+    """Cuenta los nodos ID del árbol compacto recorriendo su arreglo de tipos"""
+    return arena.kind.count(arena.kinds.index(TokenType.ID))
+
+
+def bench_tree(programa):
+    """Memoria y recorrido del árbol de TreeNode contra el árbol compacto (AstArena)"""
+    stream = tokenize_all(programa)
+    raiz = Parser(stream.reader()).parser()[0]
+    arena = AstArena.from_tree(raiz)
+    assert count_ids(raiz) == count_ids_arena(arena)
+    memoria_arbol = traced_memory(lambda: Parser(stream.reader()).parser()[0])
+    memoria_arena = traced_memory(AstArena.from_tree, raiz)
+    print(f"árbol de TreeNode:      {memoria_arbol / len(arena):8.1f} bytes/nodo  ({len(arena)} nodos)")
+    print(f"árbol compacto:         {memoria_arena / len(arena):8.1f} bytes/nodo  "
+          f"({memoria_arbol / memoria_arena:.1f}x menos)")
+    arbol, _ = timed(count_ids, raiz)
+    compacto, _ = timed(count_ids_arena, arena)
+    print(f"recorrido TreeNode:     {arbol:8.4f} s")
+    print(f"recorrido compacto:     {compacto:8.4f} s  ({arbol / compacto:.0f}x)")
+
+
+def bench_cache(programa):
+    """Compilación en frío (análisis completo y guardado en la caché) contra en caliente
+    (cargar el árbol de la caché), y la carga del árbol con pickle"""
+    directorio = tempfile.mkdtemp()
+    try:
+        cache = ParseCache(directorio)
+        simbolos = SymbolTable()
+        raiz, _ = cache.parse(programa, simbolos)
+        datos = AstArena.from_tree(raiz).to_bytes()
+        serializado = pickle.dumps(raiz, protocol=pickle.HIGHEST_PROTOCOL)
+        assert count_ids(cache.load(programa, simbolos)) == count_ids(raiz)
+
+        def frio():
+            shutil.rmtree(directorio, ignore_errors=True)
+            return cache.parse(programa, SymbolTable())
+
+        completo, _ = timed(frio, repeat=3)
+        caliente, _ = timed(lambda: cache.parse(programa, SymbolTable()), repeat=3)
+        binario, _ = timed(lambda: AstArena.from_bytes(datos, SymbolTable()).to_tree(), repeat=3)
+        con_pickle, _ = timed(pickle.loads, serializado, repeat=3)
+        print(f"caché en frío:          {completo:8.4f} s")
+        print(f"caché en caliente:      {caliente:8.4f} s  ({completo / caliente:.1f}x)")
+        print(f"carga binaria:          {binario:8.4f} s  {len(datos) / 1024:8.0f} KiB")
+        print(f"carga con pickle:       {con_pickle:8.4f} s  {len(serializado) / 1024:8.0f} KiB  "
+              f"({con_pickle / binario:.1f}x más lento)")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def compile_tree(programa):
+    """Análisis sintáctico del programa completo y después análisis semántico del árbol"""
+    analizador = Parser(Lexer(programa + '$', 0, len(programa)))
+    raiz, _ = analizador.parser()
+    return semantica(raiz, False, analizador.symbols)
+
+
+def compile_stream(programa):
+    """Análisis sintáctico y semántico declaración por declaración"""
+    analizador = Parser(Lexer(programa + '$', 0, len(programa)))
+    return semantica_stream(analizador.declarations(), False, analizador.symbols)
+
+
+def bench_streaming(programa):
+    """Tiempo y memoria máxima de compilar con el árbol completo contra por declaración"""
+    for nombre, compilar in (("árbol completo:", compile_tree), ("por declaración:", compile_stream)):
+        segundos, _ = timed(compilar, programa, repeat=3)
+        memoria = peak_memory(compilar, programa)
+        print(f"{nombre:23} {segundos:8.4f} s  {memoria / 1024 / 1024:8.1f} MiB máximo")
+
+
+def edit_and_undo(incremental, offset, inserted):
+    """Inserta el texto en el árbol incremental y luego lo vuelve a borrar"""
+    incremental.edit(offset, 0, inserted)
+    incremental.edit(offset, len(inserted), "")
+
+
+def bench_reparse(programa):
+    """Edición de un carácter a la mitad del programa: IncrementalParser.edit contra Parser"""
+    offset = programa.index("acumulador_total", len(programa) // 2)
+    editado = programa[:offset] + "x" + programa[offset:]
+    incremental = IncrementalParser(programa)
+    incremental.edit(offset, 0, "x")
+    # Con la misma tabla de identificadores, los dos árboles serializados deben ser iguales
+    raiz, _ = Parser(Lexer(editado + '$', 0, len(editado), symbols=incremental.stream.symbols)).parser()
+    assert AstArena.from_tree(incremental.root).to_bytes() == AstArena.from_tree(raiz).to_bytes(), \
+        "IncrementalParser no coincide con Parser"
+    completo, _ = timed(parse_stream, tokenize_all(editado))
+    reparsed = incremental.reparsed
+    incremental.edit(offset, 1, "")
+    # Cada repetición aplica la edición y la deshace, así que se mide la mitad
+    editar, _ = timed(edit_and_undo, incremental, offset, "x")
+    editar /= 2
+    print(f"Parser (editado):       {completo:8.4f} s")
+    print(f"IncrementalParser.edit: {editar:8.4f} s  ({completo / editar:.0f}x, "
+          f"{reparsed} de {len(incremental.trees)} declaraciones)")
+
+
+benchmarks = {
+    "clases": bench_classification,
+    "lexer": bench_lexer,
+    "columnas": bench_tokenize_all,
+    "motores": bench_engines,
+    "comentarios": bench_comments,
+    "paralelo": bench_parallel,
+    "edicion": bench_relex,
+    "reanalisis": bench_reparse,
+    "parser": bench_parser,
+    "parser_paralelo": bench_parser_parallel,
+    "arbol": bench_tree,
+    "cache": bench_cache,
+    "streaming": bench_streaming,
+}
+
+
+if __name__ == "__main__":
+    # Uso: python benchmark.py [numero_de_funciones] [seccion ...]
+    n_functions = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    secciones = sys.argv[2:] or list(benchmarks)
+    programa = generate_source(n_functions)
+    print(f"Programa de {len(programa)} caracteres, {n_functions} funciones")
+    for seccion in secciones:
+        benchmarks[seccion](programa)
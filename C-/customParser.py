@@ -1,99 +1,219 @@
-from lexer import Lexer, def_globales
+from array import array
+from bisect import bisect_left, bisect_right
+
+from lexer import def_globales, get_lexer, relex, tokenize_all
 from globalTypes import *
+from diagnostics import emit
 
 
 class Parser:
-    _instance = None
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(Parser, cls).__new__(cls)
-        return cls._instance
-
-    def __init__(self):
-        # Inicializar solo una vez para preservar el estado de singleton.
-        if not hasattr(self, '_initialized'):
-            self.prev_token = None
-            self.prev_token_lexema = None
-            self.token = None
-            self.token_lexema = None
-            self.line = None
-            self.column = None
-            self.root = None
-            self.count = 0
-            self.error = None
+    """Analizador sintáctico descendente recursivo de C-, sin recursión de Python. Una
+    expresión, con sus paréntesis, índices y llamados, se procesa en expression() con pilas
+    explícitas. Las reglas que contienen sentencias son generadores que devuelven su nodo
+    con return y se llaman con 'n = yield from self.regla()', que es casi tan rápido como
+    una llamada normal. Los bloques y las sentencias if/while anidados (nested_statements)
+    se ejecutan además con 'n = yield self.regla()' cada trampoline_depth niveles:
+    trampoline (globalTypes) los corre en su propia pila, así que la pila de Python no crece
+    con el anidamiento del programa.
+    """
+
+    # Sentencias que pueden anidarse sin límite y el método que procesa cada una
+    nested_statements = {TK.LLOPEN: "compound_tk", TK.IF: "if_tk", TK.WHILE: "while_tk"}
+    # Cada cuántos niveles de nested_statements se pasa a la pila de trampoline
+    trampoline_depth = 32
+
+    def __init__(self, lexer=None, abstract=False, source_map=False):
+        """Crea un analizador sintáctico que consume los tokens de 'lexer'
+
+        Args:
+            lexer (Lexer, optional): Analizador léxico del programa. Defaults to el creado por def_globales.
+            abstract (bool, optional): Construir solo nodos con contenido semántico: el arreglo
+                sin tamaño de un parámetro no conserva los nodos de '[' y ']'; en los dos modos
+                el nodo de la variable tiene type "arr". Defaults to False.
+            source_map (bool, optional): Guardar en 'punctuation' la posición de cada signo de
+                puntuación consumido (paréntesis, corchetes, llaves, ',' y ';'). Defaults to False.
+        """
+        self.lexer = get_lexer() if lexer is None else lexer
+        # Tabla de identificadores del programa, compartida con el analizador léxico
+        self.symbols = self.lexer.symbols
+        # Inicio de cada línea del programa, para calcular la posición de cada nodo
+        self.line_starts = self.lexer.line_starts
+        self.abstract = abstract
+        self.punctuation = array('i') if source_map else None
+        self.prev_token = None
+        self.prev_token_start = 0
+        self.prev_token_end = 0
+        self.token = None
+        self.token_start = 0
+        self.token_end = 0
+        self.root = None
+        self.count = 0
+        self.errors = []
+        self.depth = 0      # sentencias de nested_statements abiertas
+
+    @property
+    def token_lexema(self):
+        """Lexema del token actual, copiado del programa solo cuando se solicita"""
+        return self.lexer.lexeme(self.token, self.token_start, self.token_end)
+
+    @property
+    def prev_token_lexema(self):
+        """Lexema del token anterior, copiado del programa solo cuando se solicita"""
+        return self.lexer.lexeme(self.prev_token, self.prev_token_start, self.prev_token_end)
+
+    @property
+    def line(self):
+        """Línea del token actual, calculada a partir de su posición solo cuando se solicita"""
+        return self.lexer.line_column(self.token_start)[0]
+
+    @property
+    def column(self):
+        """Columna del token actual, calculada a partir de su posición solo cuando se solicita"""
+        return self.lexer.line_column(self.token_start)[1]
 
     def create_node(self, token, lexema, val=0, no_line=False):
         """
         Crea un nuevo nodo de árbol con el token y lexema dados.
+        Los nodos ID guardan además el entero de su identificador en self.symbols.
         """
+        symbol = None
+        if token == TK.ID:
+            # El lexema de un ID ya viene internado por lexeme(), así que basta con buscarlo
+            symbol = self.symbols.ids.get(lexema)
+            if symbol is None:
+                symbol = self.symbols.intern(lexema)
 
         if no_line:
-            return TreeNode(token=token, lexema=lexema)
+            return TreeNode(token=token, lexema=lexema, symbol=symbol)
 
-        return TreeNode(token=token, lexema=lexema, line=self.line + val, column=self.column)
+        # Igual que line_column (lexer), sin sus llamadas intermedias: se hace en cada nodo
+        start = self.token_start
+        line = bisect_right(self.line_starts, start)
+        return TreeNode(token=token, lexema=lexema, line=line + val,
+                        column=start - self.line_starts[line - 1] + 1, symbol=symbol)
 
     def create_error_node(self, token, lexema, error_msg):
-        """Crea un nodo de error con el token y lexema dados.
+        """Crea un nodo de error con el token y lexema dados y lo agrega a 'errors'.
+        Un mismo token se reporta una sola vez aunque fallen varias reglas en él; los
+        tokens que siguen los descarta synchronize.
 
         Returns:
             ErrorNode: Nodo del tipo ErrorNode
         """
 
-        err = ErrorNode(lexema=lexema, column=self.column,
-                        line=self.line, errorMessage=error_msg)
-
-        if not self.error:
-            self.error = err
+        line, column = self.lexer.line_column(self.token_start)
+        err = ErrorNode(lexema=lexema, column=column,
+                        line=line, errorMessage=error_msg)
 
-        self.match([TokenType.ERROR], force=True)
+        if not self.errors or (self.errors[-1].line, self.errors[-1].column) != (line, column):
+            self.errors.append(err)
 
         return err
 
+    def synchronize(self, sync):
+        """Funcion para recuperarse de un error en modo pánico: descarta tokens hasta encontrar
+        uno de 'sync', y consume el ';' que termina la sentencia con el error.
+        Los demás tokens de sincronización empiezan una sentencia o declaración (y la regla
+        que la procesa los consume) o terminan el ciclo que la llamó, así que siempre se avanza.
+
+        Args:
+            sync (frozenset): Tokens de sincronización (statement_sync o declaration_sync)
+        """
+        while self.token not in sync:
+            self.match([self.token])
+
+        if self.token == TK.SEMICOLON:
+            self.match([TK.SEMICOLON])
+
     def match(self, token_arr, force=False):
         """ Funcion para hacer match con el token actual y el token esperado, y solicitar el siguiente token
 
         Args:
-            token_arr (TokenType): Tipo del token esperado
+            token_arr (list | frozenset): Tipos de token esperados
             force (bool, optional): Flag para solcitar el siguiente token, pese a que no coincida. Defaults to False.
 
         Returns:
             bool: True si el token coincide, False en caso contrario
         """
 
-        if self.token in token_arr or force:
-            self.prev_token = self.token
-            self.prev_token_lexema = self.token_lexema
-            self.token, self.token_lexema, self.line, self.column = Lexer().get_token()
+        token = self.token
+        if token in token_arr or force:
+            if self.punctuation is not None and token in punctuation_tokens:
+                self.punctuation.append(self.token_start)
+
+            self.prev_token = token
+            self.prev_token_start = self.token_start
+            self.prev_token_end = self.token_end
+            self.token, self.token_start, self.token_end = self.lexer.get_span()
             return True
 
-        if self.token == TokenType.ERROR:
+        if token == TK.ERROR:
             self.create_error_node(
-                self.token, self.token_lexema, "Error de sintaxis")
+                token, self.token_lexema, "Error de sintaxis")
+
+        return False
+
+    def expect(self, token_arr):
+        """ Funcion para hacer match con un token obligatorio: si no coincide, reporta el error
+        en el token actual para que recover_stmt_tk o declarations se sincronicen
+
+        Args:
+            token_arr (list | frozenset): Tipos de token esperados
+
+        Returns:
+            bool: True si el token coincide, False en caso contrario
+        """
+        if self.match(token_arr):
+            return True
 
+        self.create_error_node(
+            self.token, self.token_lexema, "Error de segmentación")
         return False
 
     def parser(self):
-        """Funcion para procesar el arbol de sintaxis
+        """Funcion para procesar el arbol de sintaxis. Después de un error se sincroniza en la
+        siguiente declaración y continúa, así que reporta todos los errores en una sola pasada.
 
         Returns:
-            TreeNode: 
+            tuple: (TreeNode raíz, lista de ErrorNode con todos los errores, vacía si no hay)
         """
-        self.token, self.token_lexema, self.line, self.column = Lexer().get_token()
+        for n in self.declarations():
+            self.root.child.append(n)
 
-        self.root = self.create_node(TokenType.PROGRAM, "program")
+        return self.root, self.errors
 
-        while (self.token != TokenType.ENDFILE):
-            n = self.program_tk()
+    def declarations(self, valid_only=False):
+        """Generador de las declaraciones de nivel superior del programa, una a la vez y en
+        orden, con la misma recuperación de errores que parser(). Crea la raíz (self.root)
+        pero no le agrega las declaraciones, así que quien las recibe puede liberarlas.
+
+        Args:
+            valid_only (bool, optional): Dejar de entregar declaraciones desde el primer error
+                de sintaxis, aunque se sigue analizando el programa para reportar todos los
+                errores en 'errors'. Defaults to False.
+
+        Yields:
+            TreeNode | ErrorNode: Cada declaración de nivel superior
+        """
+        self.token, self.token_start, self.token_end = self.lexer.get_span()
+
+        self.root = self.create_node(TK.PROGRAM, "program")
+
+        while (self.token != TK.ENDFILE):
+            errors = len(self.errors)
+            n = trampoline(self.program_tk())
+
+            if len(self.errors) > errors:
+                self.synchronize(declaration_sync)
+
+            if valid_only and self.errors:
+                continue
 
             if type(n) == ErrorNode:
-                self.root.child.append(n)
+                yield n
 
             else:
-                for x in n:
-                    self.root.child.append(x)
-
-        return self.root, self.error
+                yield from n
 
     def program_tk(self):
         """Funcion para procesar el programa
@@ -104,10 +224,10 @@ class Parser:
         n = self.type_tk()
 
         n_child = None
-        if self.token == TokenType.POPEN:
-            n_child = self.fun_tk()
+        if self.token == TK.POPEN:
+            n_child = yield from self.fun_tk()
 
-        elif self.token == TokenType.BOPEN or self.token == TokenType.SEMICOLON:
+        elif self.token == TK.BOPEN or self.token == TK.SEMICOLON:
             n_child = self.var_decl_tk()
 
         if n_child == None:
@@ -131,21 +251,19 @@ class Parser:
         Returns:
             Node: Devuelve un nodo que representa la funcion marcada por un nodo (function)
         """
-        n = self.create_node(TokenType.FUNCTION, "function")
-        n_open = self.create_node(self.token, self.token_lexema)
+        n = self.create_node(TK.FUNCTION, "function")
 
-        if self.match([TokenType.POPEN]):
+        if self.match([TK.POPEN]):
             n_child = self.params_tk()
             n_c = None
 
-            self.match([TokenType.ID])
+            self.match([TK.ID])
 
-            if self.token == TokenType.PCLOSE:
-                n_close = self.create_node(self.token, self.token_lexema)
-                self.match([TokenType.PCLOSE])
+            if self.token == TK.PCLOSE:
+                self.match([TK.PCLOSE])
 
-                if self.token == TokenType.LLOPEN:
-                    n_c = self.compound_tk()
+                if self.token == TK.LLOPEN:
+                    n_c = yield from self.compound_tk()
 
             if not n_c:
                 n_c = self.create_error_node(
@@ -162,7 +280,7 @@ class Parser:
         """
         n = self.create_node(self.token, self.token_lexema)
 
-        if self.match([TokenType.ENTERO]):
+        if self.match([TK.ENTERO]):
             return n
 
     def param_tk(self):
@@ -173,9 +291,13 @@ class Parser:
         """
 
         n_t = self.type_tk()
+        if n_t is None:
+            return self.create_error_node(
+                self.token, self.token_lexema, "Error de segmentación")
+
         n_id = self.var_decl_tk(inParams=True)
 
-        if n_id and n_t:
+        if n_id:
             n_t.child.append(n_id)
 
         return n_t
@@ -187,11 +309,11 @@ class Parser:
             Node: Devuelve un nodo que representa el conjunto de parametros
         """
         n_child = []
-        n = self.create_node(TokenType.PARAMS, "params")
+        n = self.create_node(TK.PARAMS, "params")
         n_child.append(self.param_tk())
 
-        while self.token == TokenType.COMA:
-            if self.match([TokenType.COMA]):
+        while self.token == TK.COMA:
+            if self.match([TK.COMA]):
                 n_child.append(self.param_tk())
 
         n.child = n_child
@@ -205,10 +327,10 @@ class Parser:
             Node: Devuelve un nodo que representa el tipo de dato
         """
         n = self.create_node(self.token, self.token_lexema)
-        if self.match([TokenType.INT, TokenType.VOID]):
+        if self.match([TK.INT, TK.VOID]):
             n_id = self.create_node(self.token, self.token_lexema)
-            if self.token == TokenType.ID:
-                self.match([TokenType.ID])
+            if self.token == TK.ID:
+                self.match([TK.ID])
                 n_id.child.append(n)
 
                 return n_id
@@ -221,13 +343,11 @@ class Parser:
         Returns:
             Node: Devuelve un nodo que representa el bloque de instrucciones
         """
-        n_open = self.create_node(self.token, self.token_lexema)
-        if self.match([TokenType.LLOPEN]):
+        if self.match([TK.LLOPEN]):
 
-            n_child = self.compounds_tk()
+            n_child = yield from self.compounds_tk()
 
-            n_close = self.create_node(self.token, self.token_lexema)
-            if self.match([TokenType.LLCLOSE]):
+            if self.expect([TK.LLCLOSE]):
 
                 return n_child
 
@@ -238,17 +358,33 @@ class Parser:
             Node: Devuelve un nodo que representa la concatenacion de bloques de instrucciones
         """
         n = self.create_node("compound", "compound")
-        n_child = []
-        n_val = self.stmt_decl_tk()
-        n_child.append(n_val)
+        n_child = [(yield from self.recover_stmt_tk())]
 
-        while self.token != TokenType.LLCLOSE and n_val.token != TokenType.ERROR:
-            n_val = self.stmt_decl_tk()
-            n_child.append(n_val)
+        while self.token != TK.LLCLOSE and self.token != TK.ENDFILE:
+            n_child.append((yield from self.recover_stmt_tk()))
 
         n.child = n_child
         return n
 
+    def recover_stmt_tk(self):
+        """Funcion para procesar una sentencia y, si tiene errores, descartar tokens hasta
+        el siguiente de statement_sync para continuar con la que sigue
+
+        Returns:
+            Node: Devuelve un nodo que representa la sentencia, o un ErrorNode si no se pudo procesar
+        """
+        errors = len(self.errors)
+        n = yield from self.stmt_decl_tk()
+
+        if n is None:
+            n = self.create_error_node(
+                self.token, self.token_lexema, "Error de segmentación")
+
+        if len(self.errors) > errors:
+            self.synchronize(statement_sync)
+
+        return n
+
     def stmt_decl_tk(self):
         """Funcion para procesar una declaracion de sentencia
 
@@ -256,25 +392,29 @@ class Parser:
             Node: Devuelve un nodo que representa la declaracion de sentencia
         """
 
-        if self.token == TokenType.LLOPEN:
-            n = self.compound_tk()
+        rule = self.nested_statements.get(self.token)
+        if rule is not None:
+            self.depth += 1
+            if self.depth % self.trampoline_depth:
+                n = yield from getattr(self, rule)()
+            else:
+                n = yield getattr(self, rule)()
+            self.depth -= 1
 
-        elif self.token == TokenType.VOID or self.token == TokenType.INT:
+        elif self.token == TK.VOID or self.token == TK.INT:
             n = self.type_tk()
             n_child = self.var_decl_tk()
 
+            if n_child is None:
+                n_child = self.create_error_node(
+                    self.token, self.token_lexema, "Error de segmentación")
+
             n.child.append(n_child)
 
-        elif self.token == TokenType.ID or self.token == TokenType.ENTERO:
+        elif self.token == TK.ID or self.token == TK.ENTERO or self.token == TK.POPEN:
             n = self.exp_tk()
 
-        elif self.token == TokenType.IF:
-            n = self.if_tk()
-
-        elif self.token == TokenType.WHILE:
-            n = self.while_tk()
-
-        elif self.token == TokenType.RETURN:
+        elif self.token == TK.RETURN:
             n = self.return_tk()
 
         else:
@@ -290,9 +430,9 @@ class Parser:
             Node: Devuelve un nodo que representa la sentencia de return
         """
         n = self.create_node(self.token, self.token_lexema)
-        if self.match([TokenType.RETURN]):
-            if self.token == TokenType.SEMICOLON:
-                self.match([TokenType.SEMICOLON])
+        if self.match([TK.RETURN]):
+            if self.token == TK.SEMICOLON:
+                self.match([TK.SEMICOLON])
                 return n
 
             else:
@@ -308,13 +448,13 @@ class Parser:
             Node: Devuelve un nodo que representa la sentencia de while
         """
         n = self.create_node(self.token, self.token_lexema)
-        if self.match([TokenType.WHILE]):
-            if self.match([TokenType.POPEN]):
-                n_exp = self.exp_tk()
-                if self.match([TokenType.PCLOSE]):
+        if self.match([TK.WHILE]):
+            if self.expect([TK.POPEN]):
+                n_exp = self.expression()
+                if self.expect([TK.PCLOSE]):
                     n_head = self.create_node("stmt", "stmt")
                     n.child.append(n_exp)
-                    n_head.child.append(self.stmt_decl_tk())
+                    n_head.child.append((yield from self.stmt_decl_tk()))
                     n.child.append(n_head)
                     return n
 
@@ -325,434 +465,572 @@ class Parser:
             Node: Devuelve un nodo que representa la sentencia de if
         """
         n = self.create_node(self.token, self.token_lexema)
-        if self.match([TokenType.IF]):
-            if self.match([TokenType.POPEN]):
-                n_exp = self.exp_tk()
-                if self.match([TokenType.PCLOSE]):
+        if self.match([TK.IF]):
+            if self.expect([TK.POPEN]):
+                n_exp = self.expression()
+                if self.expect([TK.PCLOSE]):
                     n_head = self.create_node("stmt", "stmt")
                     n.child.append(n_exp)
-                    n_head.child.append(self.stmt_decl_tk())
+                    n_head.child.append((yield from self.stmt_decl_tk()))
                     n.child.append(n_head)
 
-                    if self.token == TokenType.ELSE:
+                    if self.token == TK.ELSE:
                         n_else = self.create_node(
                             self.token, self.token_lexema)
-                        self.match([TokenType.ELSE])
-                        n_else_c = self.stmt_decl_tk()
+                        self.match([TK.ELSE])
+                        n_else_c = yield from self.stmt_decl_tk()
                         n_else.child.append(n_else_c)
                         n.child.append(n_else)
 
                     return n
 
     def exp_tk(self):
-        """Funcion para procesar expresiones
+        """Funcion para procesar una sentencia de expresion, con el ';' que la termina
 
         Returns:
             Node: la cabeza del arbol de expresion
         """
-        n = self.create_node(self.token, self.token_lexema)
-
-        if n:
-            if n.token == TokenType.SEMICOLON:
-                n = self.create_error_node(
-                    self.token, self.token_lexema, "Error de segmentación")
-                return n
-
-            n_child = self.add_exp_tk()
-
-            return n_child
+        n = self.expression()
+        self.expect([TK.SEMICOLON])
 
-    def sin_exp_tk(self):
-        """Funcion para procesar una sumatoria (additive expresion)
-
-        Returns:
-            Node: Devuelve un nodo que representa lo que se le iguala a la variable
-        """
-        n_child = self.create_node(self.token, self.token_lexema)
-
-        if self.match([TokenType.ASIGNAR]):
-
-            n_resp = self.exp_tk()
-            n_child.child.append(n_resp)
-
-            return n_child
+        return n
 
-    def add_exp_tk(self):
-        """Funcion para procesar una sumatoria (additive expresion)
+    def expression(self):
+        """Funcion para procesar una expresion por precedencia de operadores (binding_power),
+        sin recursión: los operandos y los operadores pendientes se guardan en pilas y cada
+        nodo de operador se crea una sola vez. Las subexpresiones entre paréntesis, en un
+        índice o en los argumentos de un llamado guardan en 'pending' las pilas de la
+        expresión que las contiene, que se recuperan al terminar la subexpresión.
 
         Returns:
-            Node: Devuelve un nodo que representa lo que se le iguala a la variable
+            Node: la cabeza del arbol de expresion
         """
-        n = self.opp_varint_tk()
-
-        if n:
-            if self.token == TokenType.SEMICOLON:
-                self.match([TokenType.SEMICOLON])
-                return n
-
-            elif self.token == TokenType.SUMA or self.token == TokenType.RESTA:
-                n_arr = self.add_exp_tk2()
-
-                n_arr.child[0] = n
-
-                return n_arr
-
-            elif self.token == TokenType.MULT or self.token == TokenType.DIV:
-                n_arr = self.add_exp_tk2()
-
-                n_arr.child[0] = n
+        # Cada entrada: (operandos, operadores, nodo ID, nodo de posición o de parámetros)
+        # de la expresión que contiene a la actual; en un paréntesis, los nodos son None
+        pending = []
+        operands = []
+        operators = []
+
+        while True:
+            # Operando: una variable, un llamado a una funcion, un entero o una expresion
+            # entre parentesis
+            if self.token == TK.ID:
+                n = self.create_node(self.token, self.token_lexema)
+                self.match([TK.ID])
+
+                if self.token == TK.BOPEN:
+                    n_t = self.create_node(TK.POSITION, "posición")
+                    self.match([TK.BOPEN])
+                    pending.append((operands, operators, n, n_t))
+                    operands, operators = [], []
+                    continue
+
+                if self.token == TK.POPEN:
+                    n_t = self.create_node(TK.PARAMS, "params")
+                    self.match([TK.POPEN])
+                    if self.token != TK.PCLOSE:
+                        pending.append((operands, operators, n, n_t))
+                        operands, operators = [], []
+                        continue
+
+                    self.expect([TK.PCLOSE])
+                    n.child.append(n_t)
+
+            elif self.token == TK.ENTERO:
+                n = self.decimal_tk()
+
+            elif self.token == TK.POPEN:
+                self.match([TK.POPEN])
+                pending.append((operands, operators, None, None))
+                operands, operators = [], []
+                continue
 
-                return n_arr
-
-            elif self.token in comparison_operators:
-                n_arr = self.add_exp_tk2()
-
-                n_arr.child[0] = n
+            else:
+                message = "Error de sintaxis" if self.token == TK.ERROR else "Error de segmentación"
+                n = self.create_error_node(self.token, self.token_lexema, message)
+
+            operands.append(n)
+
+            while True:
+                # Un token que no es operador (poder 0) reduce todos los operadores pendientes
+                left, right = binding_power.get(self.token, (0, 0))
+
+                while operators and operators[-1][1] >= left:
+                    n_op = operators.pop()[0]
+                    n_right = operands.pop()
+                    n_op.child = [operands[-1], n_right]
+                    operands[-1] = n_op
+
+                if left:
+                    operators.append((self.create_node(self.token, self.token_lexema), right))
+                    self.match(binding_power)
+                    break
+
+                # La subexpresión terminó: se completa el paréntesis, índice o llamado que la
+                # contiene, que pasa a ser el siguiente operando de la expresión anterior
+                n = operands[0]
+                if not pending:
+                    return n
 
-                return n_arr
+                operands, operators, n_id, n_t = pending.pop()
+                if n_id is None:
+                    if not self.match([TK.PCLOSE]):
+                        message = "Error de sintaxis" if self.token == TK.ERROR else "Error de segmentación"
+                        n = self.create_error_node(self.token, self.token_lexema, message)
 
-            elif self.token == TokenType.ASIGNAR:
-                new_n = self.sin_exp_tk()
+                elif n_t.token == TK.POSITION:
+                    if self.expect([TK.BCLOSE]):
+                        n_t.child = [n]
+                    n_id.child.append(n_t)
+                    n = n_id
 
-                new_n.child.insert(0, n)
+                else:
+                    n_t.child.append(n)
+                    if self.token == TK.COMA:
+                        # El siguiente argumento es otra subexpresión del mismo llamado
+                        self.match([TK.COMA])
+                        pending.append((operands, operators, n_id, n_t))
+                        operands, operators = [], []
+                        break
 
-                return new_n
+                    self.expect([TK.PCLOSE])
+                    n_id.child.append(n_t)
+                    n = n_id
 
-            return n
+                operands.append(n)
 
-    def add_exp_tk2(self):
-        """Función recursiva para procesar conatneacion de expresiones
+    def var_decl_tk(self, inParams=False):
+        """Funcion para procesar una declaracion de variable
 
         Returns:
-            Node: Cabeza del arbol de las expresiones
+            Node: Devuelve un nodo que representa la declaracion de variable
         """
-        n_prev = self.create_node(self.prev_token, self.prev_token_lexema)
-        n_op = self.create_node(self.token, self.token_lexema)
-
-        if self.token == TokenType.SUMA or self.token == TokenType.RESTA:
-            self.match([TokenType.SUMA, TokenType.RESTA])
-            n_op.child.append(n_prev)
-            n_op.child.append(self.add_exp_tk())
-
-            return n_op
-
-        elif self.token == TokenType.MULT or self.token == TokenType.DIV:
-            self.match([TokenType.MULT, TokenType.DIV])
-            n_op.child.append(n_prev)
-            n_op.child.append(self.term_exp_tk())
-
-            return n_op
-
-        elif self.token in comparison_operators:
-            self.match(comparison_operators)
-            n_op.child.append(n_prev)
-            n_op.child.append(self.add_exp_tk())
-
-            return n_op
-
-        elif self.match([TokenType.ID, TokenType.ENTERO]):
-            n_op2 = self.create_node(self.token, self.token_lexema)
-            if self.token == TokenType.SUMA or self.token == TokenType.RESTA:
-                self.match([TokenType.SUMA, TokenType.RESTA])
-                n_op2.child.append(n_op)
-                n_op2.child.append(self.add_exp_tk())
-
-                return n_op2
-
-            elif self.token == TokenType.MULT or self.token == TokenType.DIV:
-                self.match([TokenType.MULT, TokenType.DIV])
-                n_op2.child.append(n_op)
-                n_op2.child.append(self.factor_tk())
+        n = self.create_node(TK.VARIABLE, "variable")
+        n_open = None
+        n_child = None
 
-                return n_op2
+        if inParams and self.token == TK.BOPEN and not self.abstract:
+            n_open = self.create_node(self.token, self.token_lexema)
 
-            elif self.match([TokenType.SEMICOLON]):
-                return n_op
+        if self.match([TK.BOPEN]):
+            if not inParams:
+                n_child = self.expression()
 
-    def term_exp_tk(self):
-        """Funcion para procesar una multiplicacion (multiplicative expresion)
+            if self.token == TK.BCLOSE:
+                # El tipo marca el arreglo en los dos modos; el tamaño, si lo hay, es el hijo
+                n.type = "arr"
+                if n_child:
+                    n.child = [n_child]
+                elif not self.abstract:
+                    n.child = [n_open, self.create_node(self.token, self.token_lexema)]
 
-        Returns:
-            Node: Devuelve un nodo que representa la multiplicacion
-        """
-        n = self.opp_varint_tk()
+                self.match([TK.BCLOSE])
 
-        if self.token == TokenType.MULT or self.token == TokenType.DIV:
-            n_op2 = self.create_node(self.token, self.token_lexema)
-            self.match([TokenType.MULT, TokenType.DIV])
-            n_op2.child.append(n)
-            fact = self.factor_tk()
+            else:
+                self.create_error_node(
+                    self.token, self.token_lexema, "Error de segmentación")
 
-            n_op2.child.append(fact)
+        if not inParams:
+            if self.match([TK.SEMICOLON]):
+                return n
 
-            return n_op2
+        else:
+            return n
 
-        if self.token == TokenType.SEMICOLON:
-            self.match([TokenType.SEMICOLON])
-            return None
 
-        return n
+def split_declarations(stream):
+    """Funcion para encontrar las declaraciones de nivel superior de un programa ya
+    tokenizado: una declaración termina en un ';' o en la '}' que cierra su primera '{'
+    fuera de cualquier llave
 
-    def factor_tk(self):
-        """Funcion para procesar un factor
+    Args:
+        stream (TokenStream): Tokens del programa
 
-        Returns:
-            Node: Devuelve un nodo que representa el factor al que se le aplica la multiplicacion
-        """
-        n = self.create_node(self.token, self.token_lexema)
+    Returns:
+        list: Índice del primer token de cada declaración, y al final el del ENDFILE
+    """
+    semicolon, llopen, llclose = TK.SEMICOLON.value, TK.LLOPEN.value, TK.LLCLOSE.value
+    bounds = [0]
+    depth = 0
 
-        if self.token == TokenType.POPEN:
-            n = self.create_node("paren", "paren")
-            self.match([TokenType.POPEN])
-            n_child = self.exp_tk()
+    for index, kind in enumerate(stream.kind):
+        if kind == llopen:
+            depth += 1
+        elif kind == llclose:
+            depth -= 1
+            if depth == 0:
+                bounds.append(index + 1)
+        elif kind == semicolon and depth == 0:
+            bounds.append(index + 1)
 
-            if self.token == TokenType.PCLOSE:
-                self.match([TokenType.PCLOSE])
+    last = len(stream) - 1
+    if bounds[-1] != last:
+        bounds.append(last)
+    return bounds
 
-                n_new = self.term_exp_tk()
 
-                if n_new:
-                    n_child.child.append(n_new)
+# Tokens del programa en cada proceso de parse_parallel, guardados por init_declaration_parser
+declaration_stream = None
 
-                return n_child
 
-        elif self.token == TokenType.ID:
-            n_new = self.term_exp_tk()
+def init_declaration_parser(stream):
+    """Guarda los tokens del programa en el proceso; se reciben una sola vez por proceso"""
+    global declaration_stream
+    declaration_stream = stream
 
-            return n_new
 
-        elif self.token == TokenType.ENTERO:
-            n_new = self.term_exp_tk()
+def parse_declarations(first, last, abstract):
+    """Analiza las declaraciones de los tokens 'first' a 'last' - 1 con su propio Parser
 
-            return n_new
+    Returns:
+        bytes | None: Árbol serializado con AstArena.to_bytes, o None si hubo errores
+    """
+    root, errors = Parser(declaration_stream.reader(first, last), abstract=abstract).parser()
+    if errors:
+        return None
+    return AstArena.from_tree(root).to_bytes()
 
-        return n
 
-    def opp_varint_tk(self):
-        """Funcion para procesar una variable, un llamado a una funcion o un entero
+def parse_parallel(stream, processes=None, chunk_size=None, abstract=False):
+    """
+    Analiza sintácticamente el programa repartiendo sus declaraciones de nivel superior en
+    un grupo de procesos.
 
-        Returns:
-            Node: Devuelve un nodo que representa la variable, el llamado a funcion o el entero
-        """
-        n_id = self.create_node(self.token, self.token_lexema)
+    Las declaraciones son independientes, así que se agrupan en fragmentos de tokens
+    consecutivos que se analizan cada uno con su propio Parser. Los hijos de la raíz de cada
+    fragmento se agregan, en orden, a una sola raíz (PROGRAM), y el resultado es el mismo
+    árbol que produce Parser.parser(). Si algún fragmento tiene errores de sintaxis, el
+    programa se vuelve a analizar completo en secuencia para reportar exactamente los
+    mismos errores y recuperarse igual que Parser.
 
-        if self.token == TokenType.ID:
-            n_id = self.var_call_tk()
+    Args:
+        stream (TokenStream): Tokens del programa, por ejemplo de tokenize_all.
+        processes (int, optional): Número de procesos. Defaults to os.cpu_count().
+        chunk_size (int, optional): Tokens por fragmento. Defaults to los necesarios para
+            tener cuatro fragmentos por proceso.
+        abstract (bool, optional): Construir el árbol abstracto (ver Parser). Defaults to False.
+
+    Returns:
+        tuple: (TreeNode raíz, lista de ErrorNode, vacía si no hay)
+    """
+    import os
+    from multiprocessing import Pool
 
-        elif self.token == TokenType.ENTERO:
-            n_id = self.decimal_tk()
+    processes = processes or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(len(stream) // (4 * processes), 1)
 
-        return n_id
+    bounds = split_declarations(stream)
+    chunks = []
+    first = 0
+    for bound in bounds[1:]:
+        if bound - first >= chunk_size or bound == bounds[-1]:
+            chunks.append((first, bound, abstract))
+            first = bound
 
-    def var_tk(self):
-        """Funcion para procesar una variable con o sin []  
+    if len(chunks) < 2:
+        return Parser(stream.reader(), abstract=abstract).parser()
 
-        Returns:
-            Node: Variable con posicion en caso de ser una posicion
-        """
-        n_t = self.create_node(TokenType.POSITION, "posición")
-        n = self.create_node(self.token, self.token_lexema)
+    with Pool(processes, init_declaration_parser, (stream,)) as pool:
+        results = pool.starmap(parse_declarations, chunks)
 
-        if self.match([TokenType.ID]):
-            if self.token == TokenType.BOPEN:
-                n_open = self.create_node(self.token, self.token_lexema)
-                self.match([TokenType.BOPEN])
+    if None in results:
+        return Parser(stream.reader(), abstract=abstract).parser()
 
-                n_child = self.exp_tk()
+    line, column = stream.line_column(stream.start[0])
+    root = TreeNode(token=TK.PROGRAM, lexema="program", line=line, column=column)
+    for data in results:
+        root.child += AstArena.from_bytes(data, stream.symbols).to_tree().child
 
-                n_close = self.create_node(self.token, self.token_lexema)
-                if self.match([TokenType.BCLOSE]):
-                    n_t.child = [n_child]
+    return root, []
 
-                n.child.append(n_t)
 
-            return n_t
+class IncrementalParser:
+    """Árbol de un programa que se mantiene al día después de cada edición, volviendo a
+    analizar solo las declaraciones de nivel superior que la edición toca.
 
-    def var_call_tk(self):
-        """Funcion para procesar una llamada a funcion
+    Guarda los tokens del programa (actualizados con relex), el índice del primer token de
+    cada declaración (split_declarations) y los nodos que produjo cada una. Cada declaración
+    se analiza por separado con su propio Parser, así que para un programa sin errores de
+    sintaxis el árbol es el mismo que el de Parser.parser(); los errores se reportan y se
+    recuperan dentro de cada declaración.
+    """
 
-        Returns:
-            Node: Devuelve un nodo que representa la llamada a funcion, con sus parametros
+    def __init__(self, programa, abstract=False):
         """
-        n = self.create_node(self.token, self.token_lexema)
-
-        if self.match([TokenType.ID]):
-            if self.token == TokenType.BOPEN:
-                n_t = self.create_node(TokenType.POSITION, "posición")
-                n_open = self.create_node(self.token, self.token_lexema)
-                self.match([TokenType.BOPEN])
-                n_child = self.exp_tk()
-
-                n_close = self.create_node(self.token, self.token_lexema)
-                if self.match([TokenType.BCLOSE]):
-                    n_t.child = [n_child]
-
-                n.child.append(n_t)
-
-            elif self.token == TokenType.POPEN:
-                n_t = self.create_node(TokenType.PARAMS, "params")
-                n_t.child = self.def_calls_tk()
-                n.child.append(n_t)
-
-            return n
-
-    def var_decl_tk(self, inParams=False):
-        """Funcion para procesar una declaracion de variable
-
-        Returns:
-            Node: Devuelve un nodo que representa la declaracion de variable
+        Args:
+            programa (str): Código fuente (opcionalmente terminado en '$')
+            abstract (bool, optional): Construir el árbol abstracto (ver Parser). Defaults to False.
         """
-        n = self.create_node(TokenType.VARIABLE, "variable")
-        n_open = self.create_node(self.token, self.token_lexema)
-        n_child = None
-
-        if self.match([TokenType.BOPEN]):
-            if not inParams:
-                n_child = self.exp_tk()
-
-            if self.token == TokenType.BCLOSE:
-                n_close = self.create_node(self.token, self.token_lexema)
-                self.match([TokenType.BCLOSE])
-
-                if n_child:
-                    n.child = [n_child]
-                else:
-                    n.child = [n_open, n_close]
-
-        n_semi = self.create_node(self.token, self.token_lexema)
-
-        if not inParams:
-            if self.match([TokenType.SEMICOLON]):
-                return n
-
-        else:
-            return n
-
-    def def_calls_tk(self):
-        """Funcion para procesar una llamada a funcion
+        self.abstract = abstract
+        self.stream = tokenize_all(programa)
+        self.bounds = split_declarations(self.stream)
+        self.trees = []
+        self.tree_errors = []
+        for first, last in zip(self.bounds, self.bounds[1:]):
+            self.parse_declaration(first, last)
+        self.root = None
+        self.reparsed = len(self.trees)
+        self.update_root()
+
+    def parse_declaration(self, first, last):
+        """Analiza los tokens de 'first' a 'last' - 1 y agrega sus nodos y errores"""
+        root, errors = Parser(self.stream.reader(first, last), abstract=self.abstract).parser()
+        self.trees.append(root.child)
+        self.tree_errors.append(errors)
+
+    def update_root(self):
+        line, column = self.stream.line_column(self.stream.start[0])
+        self.root = TreeNode(token=TK.PROGRAM, lexema="program", line=line, column=column)
+        self.root.child = [node for tree in self.trees for node in tree]
+
+    @property
+    def errors(self):
+        """Errores de sintaxis de todas las declaraciones, en orden"""
+        return [error for errors in self.tree_errors for error in errors]
+
+    def spans(self):
+        """Rango de tokens (primero, último + 1) y de caracteres (inicio, fin) de cada declaración
 
         Returns:
-            Node: Devuelve un nodo que representa la llamada a funcion, con sus parametros
+            list: Tuplas ((primer token, último token + 1), (inicio, fin)), en orden
         """
-        n_open = self.create_node(self.token, self.token_lexema)
+        start, end = self.stream.start, self.stream.end
+        return [((first, last), (start[first], end[last - 1]))
+                for first, last in zip(self.bounds, self.bounds[1:])]
 
-        if self.match([TokenType.POPEN]):
-            if not self.token == TokenType.PCLOSE:
-                n_child = self.def_call_tk()
-            else:
-                n_child = []
+    def edit(self, offset, deleted, inserted):
+        """Funcion para aplicar una edición al programa y actualizar el árbol.
 
-            n_close = self.create_node(self.token, self.token_lexema)
-            if self.match([TokenType.PCLOSE]):
+        Los tokens que terminan antes de la edición son los mismos, y los que empiezan
+        después son los anteriores desplazados. Se vuelven a analizar las declaraciones
+        desde la que contiene el primer token que cambió hasta volver a encontrar, después
+        de la edición y en una línea posterior, el inicio de una declaración anterior; las
+        demás se conservan (las siguientes, con sus líneas desplazadas).
 
-                return n_child
-
-    def def_call_tk(self):
-        """Funcion para procesar paraetros con los que se llama a una funcion
+        Args:
+            offset (int): Posición de la edición en el programa anterior
+            deleted (int): Número de caracteres borrados a partir de offset
+            inserted (str): Texto insertado en offset
 
         Returns:
-            Node: Devuelve un nodo que representa la llamada a funcion, con sus parametros
+            tuple: (TreeNode raíz, lista de ErrorNode, vacía si no hay)
         """
-        n_child = []
-
-        n = self.exp_tk()
-        if n:
-            n_child.append(n)
-
-        while self.token == TokenType.COMA:
-            if self.match([TokenType.COMA]):
-                n_child.append(self.exp_tk())
-
-        return n_child
-
-
-def parser(imprimir):
-    parser = Parser()
-    acl, error = parser.parser()
+        old = self.stream
+        new = relex(old, offset, deleted, inserted)
+        tokens = len(new) - len(old)
+        delta = len(inserted) - deleted
+        lines = inserted.count("\n") - old.programa.count("\n", offset, offset + deleted)
+
+        def same(i, j, shift):
+            return (new.kind[j] == old.kind[i] and new.start[j] == old.start[i] + shift
+                    and new.end[j] == old.end[i] + shift)
+
+        # Tokens iguales antes de la edición: [0, prefix)
+        prefix = min(bisect_right(old.end, offset), len(new))
+        while prefix > 0 and not same(prefix - 1, prefix - 1, 0):
+            prefix -= 1
+
+        # Tokens anteriores desplazados después de la edición: [suffix, len(old)). Si ninguno
+        # coincide (por ejemplo, la edición agrega o borra un '$' que termina el programa),
+        # suffix queda en len(old) y se vuelve a analizar hasta el final del programa
+        suffix = bisect_left(old.start, offset + deleted)
+        while suffix < len(old) and not (
+                0 <= suffix + tokens < len(new) and same(suffix, suffix + tokens, delta)):
+            suffix += 1
+
+        # Primera declaración afectada; la última se vuelve a analizar si se agrega al final
+        bounds = self.bounds
+        first = max(min(bisect_left(bounds, prefix) - 1, len(bounds) - 2), 0)
+
+        # Buscar las nuevas declaraciones hasta sincronizar con un inicio de declaración anterior
+        semicolon, llopen, llclose = TK.SEMICOLON.value, TK.LLOPEN.value, TK.LLCLOSE.value
+        kind = new.kind
+        last = len(new) - 1
+        new_bounds = []
+        sync = None
+        depth = 0
+        for index in range(bounds[first], last):
+            if kind[index] == llopen:
+                depth += 1
+                continue
+            if kind[index] == llclose:
+                depth -= 1
+                if depth != 0:
+                    continue
+            elif kind[index] != semicolon or depth != 0:
+                continue
+
+            bound = index + 1
+            old_bound = bound - tokens
+            if old_bound >= suffix:
+                j = bisect_left(bounds, old_bound)
+                if (j < len(bounds) and bounds[j] == old_bound and j > first and
+                        (j == len(bounds) - 1 or
+                         old.programa.find("\n", offset + deleted, old.start[old_bound]) >= 0)):
+                    sync = j
+                    break
+            new_bounds.append(bound)
+
+        if sync is None:
+            sync = len(bounds) - 1
+            end = last
+        else:
+            end = bounds[sync] + tokens
+        if (new_bounds[-1] if new_bounds else bounds[first]) != end:
+            new_bounds.append(end)
+
+        # Conservar las declaraciones anteriores y las siguientes, con las líneas desplazadas
+        trees, tree_errors = self.trees, self.tree_errors
+        self.stream = new
+        self.bounds = bounds[:first + 1] + new_bounds + [b + tokens for b in bounds[sync + 1:]]
+        self.trees = trees[:first]
+        self.tree_errors = tree_errors[:first]
+        for start, end in zip([bounds[first]] + new_bounds, new_bounds):
+            self.parse_declaration(start, end)
+        self.reparsed = len(self.trees) - first
+
+        if lines:
+            shift_lines(trees[sync:], tree_errors[sync:], lines)
+        self.trees += trees[sync:]
+        self.tree_errors += tree_errors[sync:]
+
+        self.update_root()
+        return self.root, self.errors
+
+
+def shift_lines(trees, tree_errors, lines):
+    """Suma 'lines' a la línea de todos los nodos de las declaraciones y de sus errores"""
+    shifted = set()
+    stack = [node for tree in trees for node in tree]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        node.line += lines
+        if type(node) is ErrorNode:
+            shifted.add(id(node))
+        elif node.child:
+            stack.extend(node.child)
+
+    for errors in tree_errors:
+        for error in errors:
+            if id(error) not in shifted:
+                error.line += lines
+
+
+def parser(imprimir, abstract=False):
+    parser = Parser(abstract=abstract)
+    acl, errors = parser.parser()
 
     if imprimir:
-        print(" ")
-        print(" ")
-        print(" ")
-        print("-------------------------------------------------------------")
+        emit(" ")
+        emit(" ")
+        emit(" ")
+        emit("-------------------------------------------------------------")
 
-        if error:
-            print(
+        for error in errors:
+            emit(
                 f"Error: {error.errorMessage} en la posicion {error.line}:{error.column}, lexema inesperado '{error.lexema}'")
 
-        else:
-            print("No se encontraron errores en el procesamiento del arbol")
+        if not errors:
+            emit("No se encontraron errores en el procesamiento del arbol")
 
-        print("-------------------------------------------------------------")
-        print(" ")
+        emit("-------------------------------------------------------------")
+        emit(" ")
         print_tree(acl)
 
-    return acl, error
+    return acl, errors
 
 
 def globales(prog, pos, long_):
     def_globales(prog, pos, long_)
-    # Crear la instancia singleton (si no existe aún)
-    Lexer()
-    Parser()
 
 
-def print_tree(node, level=0, prefix="", is_last=True, visited=None):
+def print_tree(node, max_depth=None, max_width=None):
     """Funcion para mostrar el abrol de forma visual 
     (para el dibujo del arbol con lineas continuas se apoyo en herramientas de AI)
 
+    El recorrido usa una pila explícita en lugar de recursión y un solo conjunto con los nodos
+    del camino desde la raíz para detectar ciclos. Las líneas se envían a emit en bloques.
+
     Args:
-        node (TreeNode): Nodo del arbol que representa el token
-        level (int, optional): Representa el nivel de profunididad del arbol. Valor default en 0.
-        prefix (str, optional): Representa un acumulador para dibujar las lineas. Valor default en "".
-        is_last (bool, optional): Representa si es el ultimo nodo de la rama. Valor default en True.
-        visited (_type_, optional): Representa un conjunto de nodos visitados para buscar y evitar imprimir infinitamente en caso de ciclos. Valor default en None.
+        node (TreeNode): Nodo raíz del arbol
+        max_depth (int, optional): Nivel máximo a mostrar; los hijos de los nodos de ese nivel
+            se resumen en una línea. Defaults to None (sin límite).
+        max_width (int, optional): Hijos a mostrar por nodo; el resto se resume en una línea.
+            Defaults to None (sin límite).
     """
-    if visited is None:
-        visited = set()
-
-    if node is None:
-        return
-
-    # Check for cycles
-    node_id = id(node)
-    if node_id in visited:
-        print(prefix + ("└── " if is_last else "├── ") + "CYCLE DETECTED")
-        return
-
-    # Add current node to visited set
-    visited.add(node_id)
-
-    # Determine the branch symbol
-    branch = "└── " if is_last else "├── "
-
-    # Handle the node information safely
-    try:
-        if hasattr(node, 'token') and node.token is not None:
-            token_repr = " (" + str(node.line) + ":" + \
+    lines = []
+    path = set()
+
+    # Cada entrada es (nodo, nivel, prefijo, es el último hijo), una línea ya armada, o el
+    # id de un nodo cuyos hijos ya se terminaron de mostrar y que sale del camino
+    stack = [(node, 0, "", True)]
+    while stack:
+        entry = stack.pop()
+
+        if type(entry) is int:
+            path.discard(entry)
+            continue
+
+        if type(entry) is str:
+            lines.append(entry)
+            continue
+
+        node, level, prefix, is_last = entry
+        if node is None:
+            continue
+
+        # Determine the branch symbol
+        branch = "└── " if is_last else "├── "
+
+        # Check for cycles
+        node_id = id(node)
+        if node_id in path:
+            lines.append(prefix + branch + "CYCLE DETECTED")
+            continue
+
+        if getattr(node, 'token', None) is not None:
+            node_info = " (" + str(node.line) + ":" + \
                 str(node.column) + ")" + str(node.token)
-            node_info = token_repr
         else:
             node_info = "ROOT"
 
         # Add lexema if available
-        if hasattr(node, 'lexema') and node.lexema:
+        if getattr(node, 'lexema', None):
             node_info += f" {node.lexema}"
-    except Exception:
-        node_info = f"Error: Se encontro el token inesperado {node.token} en la posicion {node.line}:{node.column}"
-
-    print(prefix + branch + node_info)
-
-    # Prepare prefix for children
-    child_prefix = prefix + ("    " if is_last else "│   ")
-
-    # Print all children
-    if hasattr(node, 'child'):
-        try:
-            children = node.child
-            for i, child in enumerate(children):
-                is_last_child = i == len(children) - 1
-                print_tree(child, level + 1, child_prefix,
-                           is_last_child, visited.copy())
-        except Exception as e:
-            print(child_prefix + f"Error accessing children: {str(e)}")
+        if getattr(node, 'type', None):
+            node_info += f" ({node.type})"
+
+        lines.append(prefix + branch + node_info)
+        if len(lines) >= 4096:
+            emit("\n".join(lines))
+            lines.clear()
+
+        children = getattr(node, 'child', None)
+        if not children:
+            continue
+
+        # Prepare prefix for children
+        child_prefix = prefix + ("    " if is_last else "│   ")
+
+        if max_depth is not None and level >= max_depth:
+            lines.append(child_prefix + f"└── ... (hijos omitidos: {len(children)})")
+            continue
+
+        path.add(node_id)
+        stack.append(node_id)
+
+        hidden = 0
+        if max_width is not None and len(children) > max_width:
+            hidden = len(children) - max_width
+            children = children[:max_width]
+            stack.append(child_prefix + f"└── ... (hijos omitidos: {hidden})")
+
+        last = len(children) - 1
+        for i in range(last, -1, -1):
+            stack.append((children[i], level + 1, child_prefix, i == last and not hidden))
+
+    if lines:
+        emit("\n".join(lines))
@@ -0,0 +1,93 @@
+''' Destino de los diagnósticos del compilador (errores, trazas de tokens, árbol y tablas) '''
+
+import sys
+
+
+class Diagnostics:
+    """Destino silencioso: descarta los mensajes sin darles formato.
+    Es el destino por omisión, para que un análisis en lote no pague la escritura
+    en la terminal por cada token ni acumule los mensajes en memoria.
+    """
+
+    def emit(self, *values, sep=" ", end="\n"):
+        """Recibe un mensaje con el mismo formato que print()"""
+        pass
+
+    def flush(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+class MemoryWriter(Diagnostics):
+    """Guarda los mensajes en memoria, para leerlos después con getvalue()"""
+
+    def __init__(self):
+        self.messages = []
+
+    def emit(self, *values, sep=" ", end="\n"):
+        """Registra un mensaje con el mismo formato que print()"""
+        self.messages.append(sep.join(map(str, values)) + end)
+
+    def getvalue(self):
+        """Devuelve todos los mensajes registrados como una sola cadena"""
+        return "".join(self.messages)
+
+    def clear(self):
+        self.messages.clear()
+
+
+class BufferedWriter(MemoryWriter):
+    """Escribe los mensajes en 'stream' en bloques de al menos 'buffer_size' caracteres"""
+
+    def __init__(self, stream=None, buffer_size=1 << 16):
+        """
+        Args:
+            stream (file, optional): Archivo de salida. Defaults to sys.stdout al momento de escribir.
+            buffer_size (int, optional): Caracteres acumulados antes de escribir. Defaults to 64 KiB.
+        """
+        super().__init__()
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.size = 0
+
+    def emit(self, *values, sep=" ", end="\n"):
+        message = sep.join(map(str, values)) + end
+        self.messages.append(message)
+        self.size += len(message)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        stream = sys.stdout if self.stream is None else self.stream
+        if self.messages:
+            stream.write("".join(self.messages))
+            self.messages.clear()
+            self.size = 0
+        stream.flush()
+
+
+# Destino actual de los diagnósticos
+sink = Diagnostics()
+
+
+def get_sink():
+    return sink
+
+
+def set_sink(new_sink):
+    """Cambia el destino de los diagnósticos y regresa el anterior, ya vaciado"""
+    global sink
+    previous = sink
+    previous.flush()
+    sink = new_sink
+    return previous
+
+
+def emit(*values, sep=" ", end="\n"):
+    """Envía un mensaje al destino actual, con el mismo formato que print()"""
+    sink.emit(*values, sep=sep, end=end)
@@ -1,9 +1,18 @@
 ''' Gabriel Rodriguez De Los Reyes - A01027384 '''
 
-from enum import Enum
+import gc
+import struct
+import sys
+import threading
+from array import array
+from itertools import accumulate
+from enum import Enum, IntEnum
 
 
-class TokenType(Enum):
+class TokenType(IntEnum):
+    """Tipos de token. Los miembros son enteros pequeños (se comparan y se usan como llave
+    de diccionario o de conjunto como int), pero se muestran por su nombre, como TokenType.ID.
+    """
     PROGRAM = 99
     ENDFILE = 0
     ENTERO = 4
@@ -40,6 +49,27 @@ class TokenType(Enum):
     PARAMS = 36
     POSITION = 37
 
+    def __str__(self):
+        return f"TokenType.{self._name_}"
+
+    def __format__(self, format_spec):
+        return format(str(self), format_spec)
+
+
+class TK:
+    """Los mismos miembros de TokenType como atributos de una clase ordinaria. En el camino
+    crítico del analizador léxico y sintáctico TK.ID se resuelve mucho más rápido que
+    TokenType.ID (que pasa por la metaclase de Enum) y devuelve el mismo objeto.
+    """
+
+
+for token in TokenType:
+    setattr(TK, token.name, token)
+del token
+
+# Miembro de TokenType de cada código entero, sin pasar por la llamada TokenType(código)
+token_types = {token.value: token for token in TokenType}
+
 
 class CharMap(Enum):
     DIGITS = '0123456789'
@@ -99,51 +129,121 @@ char_map = {
     20: CharMap.OTHER.value
 }
 
-# Estaos que se regresan
-rewind_states = {4, 5, 10, 19}
-
-final_states = {
-    4:  TokenType.ENTERO,       # Digitos
-    5:  TokenType.REAL,         # Digitos.Digitos
-    6:  TokenType.SUMA,         # +
-    7:  TokenType.RESTA,        # -
-    8:  TokenType.ERROR,        # ERROR
-    10: TokenType.ID,          # ID (Palabras reservadas)
-    11: TokenType.MULT,        # *
-    12: TokenType.DIV,         # /
-    13: TokenType.MAYOR,       # >
-    14: TokenType.MENOR,       # <
-    15: TokenType.MAYORI,      # >=
-    16: TokenType.MENORI,      # <=
-    17: TokenType.IGUAL,       # ==
-    18: TokenType.NIGUAL,      # !=
-    19: TokenType.ASIGNAR,     # =
-    20: TokenType.SEMICOLON,   # ;
-    21: TokenType.COMA,        # ,
-    22: TokenType.POPEN,       # (
-    23: TokenType.PCLOSE,      # )
-    24: TokenType.LLOPEN,       # {
-    25: TokenType.LLCLOSE,      # }
-    26: TokenType.BOPEN,      # [
-    27: TokenType.BCLOSE,     # ]
-}
+# Columna de la tabla de estados para los caracteres que no pertenecen a ninguna clase
+OTHER_COLUMN = len(char_map) - 1
+
+
+class CharClassTable(dict):
+    """Tabla para str.translate que convierte cada carácter en el código de su columna
+    en la tabla de estados. Se construye una sola vez a partir de char_map.
+    """
+
+    def __init__(self):
+        super().__init__()
+        for column, chars in reversed(char_map.items()):
+            for char in chars:
+                self[ord(char)] = column
+
+    def __missing__(self, key):
+        self[key] = OTHER_COLUMN
+        return OTHER_COLUMN
+
+
+char_classes = CharClassTable()
+
+
+class SymbolTable:
+    """Tabla de identificadores internados. Cada nombre distinto recibe un entero
+    consecutivo (desde 0) y todas sus apariciones comparten la misma cadena, por lo que
+    las tablas de símbolos se indexan y comparan con enteros.
+
+    Cada compilación tiene su propia tabla: la crea el analizador léxico (Lexer o
+    TokenStream), la comparte con Parser y se pasa al análisis semántico, así que los
+    enteros solo valen dentro del mismo programa y la tabla se libera con él.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getstate__(self):
+        # El candado no se puede copiar a otro proceso; basta con los nombres en orden
+        return self.names
+
+    def __setstate__(self, names):
+        self.names = list(names)
+        self.ids = {name: symbol for symbol, name in enumerate(self.names)}
+        self.lock = threading.Lock()
+
+    def intern(self, name):
+        """Devuelve el entero del nombre, asignándole uno nuevo si no existe"""
+        symbol = self.ids.get(name)
+        if symbol is None:
+            with self.lock:
+                symbol = self.ids.get(name)
+                if symbol is None:
+                    symbol = len(self.names)
+                    self.names.append(name)
+                    self.ids[name] = symbol
+        return symbol
+
+    def get(self, name):
+        """Devuelve el entero del nombre, o None si nunca se ha internado"""
+        return self.ids.get(name)
 
-comparison_operators = [
+    def name(self, symbol):
+        return self.names[symbol]
+
+    def canonical(self, name):
+        """Devuelve la cadena compartida por todas las apariciones del nombre"""
+        symbol = self.ids.get(name)
+        if symbol is None:
+            symbol = self.intern(name)
+        return self.names[symbol]
+
+
+comparison_operators = frozenset({
     TokenType.MAYOR,    # >
     TokenType.MENOR,    #
     TokenType.MAYORI,   # >=
     TokenType.MENORI,   # <=
     TokenType.IGUAL,    # ==
     TokenType.NIGUAL    # !=
-]
+})
 
-operation_operators = [
+operation_operators = frozenset({
     TokenType.SUMA,     # +
     TokenType.RESTA,    # -
     TokenType.MULT,     # *
     TokenType.DIV,      # /
     TokenType.ASIGNAR   # =
-]
+})
+
+additive_operators = frozenset({TokenType.SUMA, TokenType.RESTA})
+multiplicative_operators = frozenset({TokenType.MULT, TokenType.DIV})
+punctuation_tokens = frozenset({
+    TokenType.SEMICOLON, TokenType.COMA, TokenType.POPEN, TokenType.PCLOSE,
+    TokenType.BOPEN, TokenType.BCLOSE, TokenType.LLOPEN, TokenType.LLCLOSE
+})
+
+# Tokens de sincronización para la recuperación de errores en modo pánico: después de
+# un error el analizador descarta tokens hasta encontrar uno de estos
+statement_sync = frozenset({
+    TokenType.SEMICOLON, TokenType.LLOPEN, TokenType.LLCLOSE, TokenType.INT, TokenType.VOID,
+    TokenType.IF, TokenType.WHILE, TokenType.RETURN, TokenType.ENDFILE
+})
+declaration_sync = frozenset({TokenType.INT, TokenType.VOID, TokenType.ENDFILE})
+
+# Poder de enlace (izquierdo, derecho) de cada operador binario para el análisis de
+# expresiones por precedencia. Un poder derecho menor que el izquierdo asocia a la derecha.
+binding_power = {TokenType.ASIGNAR: (2, 1)}
+binding_power.update(dict.fromkeys(comparison_operators, (3, 4)))
+binding_power.update(dict.fromkeys(additive_operators, (5, 6)))
+binding_power.update(dict.fromkeys(multiplicative_operators, (7, 8)))
 
 # -------- Parser -------------
 
@@ -184,21 +284,383 @@ class VarType():
 
 
 class TreeNode:
-    def __init__(self, type=None, token=TokenType, lexema=None, child=None, line=None, column=None):
+    # Sin __dict__ por instancia: los árboles de programas grandes ocupan mucha menos memoria
+    __slots__ = ("child", "type", "token", "lexema", "line", "column", "symbol", "parent")
+
+    def __init__(self, type=None, token=TokenType, lexema=None, child=None, line=None, column=None, symbol=None):
         # Use None as default and create a new list in the method body
         self.child = [] if child is None else child  # Each instance gets its own list
-        self.type = type
+        self.type = type       # "arr" en el nodo VARIABLE de un arreglo
         self.token = token
         self.lexema = lexema   # tipo NodeKind, en globalTypes
         self.line = line
         self.column = column
+        self.symbol = symbol   # entero del identificador en la SymbolTable del programa (solo nodos ID)
         self.parent = None
 
 
 class ErrorNode:
+    __slots__ = ("lexema", "line", "column", "token", "errorMessage")
+
     def __init__(self, lexema, line=None, column=None, errorMessage=None):
         self.lexema = lexema
         self.line = line
         self.column = column
         self.token = TokenType.ERROR
         self.errorMessage = errorMessage
+
+
+def trampoline(generator):
+    """Funcion para ejecutar un generador recursivo sin usar la pila de Python. El generador
+    llama a otro con 'valor = yield otro_generador()': el llamado se ejecuta en una pila
+    explícita y su valor de return se envía de vuelta al que lo llamó. Las excepciones
+    suben por la misma pila, así que se comporta igual que la recursión normal, pero la
+    profundidad solo depende de la memoria y no de sys.getrecursionlimit().
+
+    Args:
+        generator (generator): Generador inicial
+
+    Returns:
+        object: Valor de return del generador inicial
+    """
+    stack = []
+    value = None
+    error = None
+    while True:
+        try:
+            if error is None:
+                called = generator.send(value)
+            else:
+                raised, error = error, None
+                called = generator.throw(raised)
+        except StopIteration as stop:
+            if not stack:
+                return stop.value
+            generator = stack.pop()
+            value = stop.value
+        except BaseException as exception:
+            if not stack:
+                raise
+            generator = stack.pop()
+            error = exception
+        else:
+            stack.append(generator)
+            generator = called
+            value = None
+
+
+class AstArena:
+    """Representación compacta de un árbol de TreeNode. Cada nodo es un índice y sus campos
+    viven en arreglos paralelos de enteros; los hijos se enlazan con first_child y
+    next_sibling (-1 si no hay). Los nodos quedan en preorden, así que recorrer el árbol
+    completo es recorrer los índices en orden.
+
+    Un hijo None se guarda como un nodo de tipo -1, para que to_tree reconstruya el árbol
+    exacto que produjo el analizador sintáctico.
+    """
+    __slots__ = ("kind", "lexeme", "type", "line", "column", "symbol", "first_child",
+                 "next_sibling", "kinds", "strings", "messages")
+
+    column_names = ("kind", "lexeme", "type", "line", "column", "symbol", "first_child",
+                    "next_sibling")
+
+    # Encabezado de to_bytes: firma, versión del formato, si los enteros son little-endian,
+    # y número de nodos, de tipos de nodo, de lexemas y de mensajes de error
+    header = struct.Struct("<4sB?IIII")
+    magic = b"CAST"
+    format_version = 2
+
+    def __init__(self):
+        self.kind = array('i')           # índice en kinds, o -1 para un hijo None
+        self.lexeme = array('i')         # índice en strings, o -1
+        self.type = array('i')           # índice en strings del type del nodo, o -1
+        self.line = array('i')
+        self.column = array('i')
+        self.symbol = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.kinds = []                  # token de cada tipo de nodo (TokenType o texto)
+        self.strings = []                # lexemas distintos
+        self.messages = {}               # índice de cada ErrorNode -> mensaje
+
+    def __len__(self):
+        return len(self.kind)
+
+    @classmethod
+    def from_tree(cls, root):
+        """Funcion para construir la representación compacta de un árbol, sin recursión
+
+        Args:
+            root (TreeNode): Raíz del árbol
+
+        Returns:
+            AstArena: Árbol compacto, con la raíz en el índice 0
+        """
+        arena = cls()
+        kinds = {}
+        strings = {}
+        kind, lexeme, types, line, column, symbol = (arena.kind, arena.lexeme, arena.type,
+                                                     arena.line, arena.column, arena.symbol)
+        first_child, next_sibling = arena.first_child, arena.next_sibling
+        last_child = []
+        stack = [(root, -1)]
+
+        while stack:
+            node, parent = stack.pop()
+            index = len(kind)
+
+            if parent >= 0:
+                if last_child[parent] < 0:
+                    first_child[parent] = index
+                else:
+                    next_sibling[last_child[parent]] = index
+                last_child[parent] = index
+
+            first_child.append(-1)
+            next_sibling.append(-1)
+            last_child.append(-1)
+
+            if node is None:
+                kind.append(-1)
+                lexeme.append(-1)
+                types.append(-1)
+                line.append(-1)
+                column.append(-1)
+                symbol.append(-1)
+                continue
+
+            if node.token not in kinds:
+                kinds[node.token] = len(arena.kinds)
+                arena.kinds.append(node.token)
+            kind.append(kinds[node.token])
+
+            if node.lexema is None:
+                lexeme.append(-1)
+            else:
+                if node.lexema not in strings:
+                    strings[node.lexema] = len(arena.strings)
+                    arena.strings.append(node.lexema)
+                lexeme.append(strings[node.lexema])
+
+            # Los ErrorNode no tienen type
+            node_type = getattr(node, "type", None)
+            if node_type is None:
+                types.append(-1)
+            else:
+                if node_type not in strings:
+                    strings[node_type] = len(arena.strings)
+                    arena.strings.append(node_type)
+                types.append(strings[node_type])
+
+            line.append(-1 if node.line is None else node.line)
+            column.append(-1 if node.column is None else node.column)
+
+            if isinstance(node, ErrorNode):
+                symbol.append(-1)
+                arena.messages[index] = node.errorMessage
+                continue
+
+            symbol.append(-1 if node.symbol is None else node.symbol)
+            # Una regla que falla puede dejar child en None (por ejemplo la lista de
+            # argumentos de 'f(1;'); se guarda como un nodo sin hijos
+            for child in reversed(node.child or ()):
+                stack.append((child, index))
+
+        return arena
+
+    def children(self, index):
+        """Índices de los hijos del nodo 'index', en orden"""
+        child = self.first_child[index]
+        while child >= 0:
+            yield child
+            child = self.next_sibling[child]
+
+    def token(self, index):
+        return self.kinds[self.kind[index]]
+
+    def lexema(self, index):
+        string = self.lexeme[index]
+        return None if string < 0 else self.strings[string]
+
+    def node_type(self, index):
+        string = self.type[index]
+        return None if string < 0 else self.strings[string]
+
+    def node(self, index):
+        """Funcion para crear el TreeNode (sin hijos) o ErrorNode del índice dado
+
+        Returns:
+            TreeNode | ErrorNode | None: None si el índice es un hijo ausente
+        """
+        if self.kind[index] < 0:
+            return None
+
+        line = self.line[index]
+        column = self.column[index]
+        line = None if line < 0 else line
+        column = None if column < 0 else column
+
+        if index in self.messages:
+            return ErrorNode(lexema=self.lexema(index), line=line, column=column,
+                             errorMessage=self.messages[index])
+
+        symbol = self.symbol[index]
+        return TreeNode(type=self.node_type(index), token=self.token(index),
+                        lexema=self.lexema(index), line=line, column=column,
+                        symbol=None if symbol < 0 else symbol)
+
+    def to_tree(self, index=0):
+        """Funcion para reconstruir el subárbol del índice dado como TreeNode, sin recursión.
+        Como los nodos están en preorden, el subárbol ocupa los índices de 'index' a su último
+        descendiente: primero se crean todos sus nodos y después se enlazan con sus hijos.
+
+        Returns:
+            TreeNode: Raíz del subárbol
+        """
+        first_child, next_sibling = self.first_child, self.next_sibling
+
+        # El último descendiente es el último hijo del último hijo... del nodo
+        end = index
+        while first_child[end] >= 0:
+            end = first_child[end]
+            while next_sibling[end] >= 0:
+                end = next_sibling[end]
+        end += 1
+
+        # Los nodos nuevos no forman ciclos: el recolector de ciclos se pausa mientras se
+        # crean, porque en árboles grandes recorrería los mismos nodos una y otra vez
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self.build_tree(index, end)
+        finally:
+            if enabled:
+                gc.enable()
+
+    def build_tree(self, index, end):
+        """Crea los nodos de los índices de 'index' a 'end' - 1 y los enlaza (ver to_tree)"""
+        first_child, next_sibling = self.first_child, self.next_sibling
+        kinds, strings = self.kinds, self.strings
+        nodes = [TreeNode(None if node_type < 0 else strings[node_type], kinds[kind],
+                          None if lexeme < 0 else strings[lexeme], None,
+                          None if line < 0 else line, None if column < 0 else column,
+                          None if symbol < 0 else symbol)
+                 for kind, lexeme, node_type, line, column, symbol in
+                 zip(self.kind[index:end], self.lexeme[index:end], self.type[index:end],
+                     self.line[index:end], self.column[index:end], self.symbol[index:end])]
+
+        for error in self.messages:
+            if index <= error < end:
+                nodes[error - index] = self.node(error)
+
+        if -1 in self.kind[index:end]:
+            for offset in range(end - index):
+                if self.kind[index + offset] < 0:
+                    nodes[offset] = None
+
+        for offset in range(end - index):
+            child = first_child[index + offset]
+            if child >= 0:
+                children = nodes[offset].child
+                while child >= 0:
+                    children.append(nodes[child - index])
+                    child = next_sibling[child]
+
+        return nodes[0]
+
+    def to_bytes(self):
+        """Funcion para serializar el árbol compacto: el encabezado, los arreglos de enteros
+        tal como están en memoria y todos los textos (tipos de nodo que no son TokenType,
+        lexemas y mensajes) en un solo bloque UTF-8
+
+        Returns:
+            bytes: Árbol serializado, para from_bytes
+        """
+        kind_tokens = array('i', [-1 if type(kind) is str else kind for kind in self.kinds])
+        texts = [kind if type(kind) is str else "" for kind in self.kinds]
+        texts += self.strings
+        texts += self.messages.values()
+
+        parts = [self.header.pack(self.magic, self.format_version, sys.byteorder == "little",
+                                  len(self), len(self.kinds), len(self.strings),
+                                  len(self.messages)),
+                 kind_tokens.tobytes()]
+        parts += [getattr(self, name).tobytes() for name in self.column_names]
+        parts.append(array('i', self.messages).tobytes())
+        parts.append(array('i', map(len, texts)).tobytes())
+        parts.append("".join(texts).encode("utf-8"))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data, symbols):
+        """Funcion para reconstruir un árbol compacto serializado con to_bytes. Los enteros de
+        los identificadores solo valen en la tabla que los asignó, así que se vuelven a
+        internar por su nombre en 'symbols'.
+
+        Args:
+            data (bytes): Árbol serializado
+            symbols (SymbolTable): Tabla de identificadores del programa que recibe el árbol
+
+        Returns:
+            AstArena: Árbol compacto
+
+        Raises:
+            ValueError: Si los datos no son un árbol serializado con este formato
+        """
+        if len(data) < cls.header.size:
+            raise ValueError("Los datos no son un árbol serializado")
+        magic, version, little, n_nodes, n_kinds, n_strings, n_messages = \
+            cls.header.unpack_from(data)
+        if magic != cls.magic or version != cls.format_version:
+            raise ValueError("Los datos no son un árbol serializado con esta versión del formato")
+
+        view = memoryview(data)
+        offset = cls.header.size
+        swap = little != (sys.byteorder == "little")
+
+        def read(count):
+            nonlocal offset
+            values = array('i')
+            end = offset + count * values.itemsize
+            if end > len(data):
+                raise ValueError("El árbol serializado está incompleto")
+            values.frombytes(view[offset:end])
+            if swap:
+                values.byteswap()
+            offset = end
+            return values
+
+        arena = cls()
+        kind_tokens = read(n_kinds)
+        for name in cls.column_names:
+            setattr(arena, name, read(n_nodes))
+        message_nodes = read(n_messages)
+        lengths = read(n_kinds + n_strings + n_messages)
+
+        text = str(view[offset:], "utf-8")
+        bounds = list(accumulate(lengths, initial=0))
+        texts = [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+        arena.kinds = [texts[i] if token < 0 else token_types[token]
+                       for i, token in enumerate(kind_tokens)]
+        arena.strings = texts[n_kinds:n_kinds + n_strings]
+        arena.messages = dict(zip(message_nodes, texts[n_kinds + n_strings:]))
+
+        # Volver a internar los identificadores y compartir la cadena de 'symbols'
+        renamed = {}
+        symbol, lexeme, strings = arena.symbol, arena.lexeme, arena.strings
+        for index, old in enumerate(symbol):
+            if old >= 0:
+                new = renamed.get(old)
+                if new is None:
+                    new = renamed[old] = symbols.intern(strings[lexeme[index]])
+                    strings[lexeme[index]] = symbols.name(new)
+                symbol[index] = new
+
+        return arena
+
+    @property
+    def nbytes(self):
+        """Bytes que ocupan los arreglos de enteros"""
+        return sum(getattr(self, name).itemsize * len(getattr(self, name))
+                   for name in self.column_names)
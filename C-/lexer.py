@@ -1,40 +1,106 @@
 ''' Gabriel Rodriguez De Los Reyes - A01027384 '''
 
-from LexerStatesTable import states_table
-from globalTypes import TokenType, resreved_words, char_map, rewind_states, final_states
-
-# Variables globales para el análisis léxico.
-global programa, posicion, progLong
-# La cadena del programa a analizar (se establecerá en globales())
-programa = ""
-posicion = 0    # Índice actual en la cadena
-progLong = 0    # Longitud de la cadena del programa
-current_line = 1   # Línea actual en el análisis
-current_column = 1  # Columna actual en el análisis
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from LexerStatesTable import initial_state, error_state, final_states, rewind_states, base, default, next_state, check
+from globalTypes import SymbolTable, TokenType, TK, resreved_words, char_classes, token_types
+from diagnostics import emit
+
+# Patrón maestro del motor 'regex': una alternativa con nombre por cada token de final_states,
+# más espacios y comentarios /* */. Cada alternativa reproduce exactamente lo que acepta
+# la tabla de transiciones (incluido el carácter que consumen '>' y '<'); lo que no coincide aquí
+# (tokens inválidos, comentarios sin cerrar, fin de archivo) se resuelve con el DFA.
+token_patterns = [
+    ("SKIP", r"[ \t\n]+|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/"),
+    ("ENDFILE", r"\$"),
+    ("REAL", r"[0-9]*\.[0-9]+(?=[^0-9$])"),
+    ("ENTERO", r"[0-9]+(?=[^0-9.A-Za-z_$])"),
+    ("ID", r"[A-Za-z_][A-Za-z0-9_]*(?=[^A-Za-z0-9_$])"),
+    ("MAYORI", r">="),
+    ("MAYOR", r">[^=$]"),
+    ("MENORI", r"<="),
+    ("MENOR", r"<[^=$]"),
+    ("IGUAL", r"=="),
+    ("NIGUAL", r"!="),
+    ("ASIGNAR", r"[=!](?=[^=$])"),
+    ("SUMA", r"\+"),
+    ("RESTA", r"-"),
+    ("MULT", r"\*"),
+    ("DIV", r"/(?!\*)"),
+    ("SEMICOLON", r";"),
+    ("COMA", r","),
+    ("POPEN", r"\("),
+    ("PCLOSE", r"\)"),
+    ("LLOPEN", r"\{"),
+    ("LLCLOSE", r"\}"),
+    ("BOPEN", r"\["),
+    ("BCLOSE", r"\]"),
+]
+master_pattern = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern in token_patterns), re.DOTALL)
+# Espacios que se ignoran antes de un token, y caracteres que forman parte de un token inválido
+whitespace_pattern = re.compile(r"[ \t\n]*")
+error_pattern = re.compile(r"[^ \t\n$]*")
+# Columna de la tabla de estados de un espacio, con la que el fin del programa termina un token
+space_column = char_classes[ord(' ')]
+
+pattern_tokens = {name: TokenType[name] for name, _ in token_patterns if name in TokenType.__members__}
+
+# Tokens de un solo carácter que el motor 'numpy' reconoce sin recorrer el DFA
+single_char_tokens = {
+    "+": TokenType.SUMA, "-": TokenType.RESTA, "*": TokenType.MULT, "/": TokenType.DIV,
+    ";": TokenType.SEMICOLON, ",": TokenType.COMA, "(": TokenType.POPEN, ")": TokenType.PCLOSE,
+    "{": TokenType.LLOPEN, "}": TokenType.LLCLOSE, "[": TokenType.BOPEN, "]": TokenType.BCLOSE,
+}
 
 
 class Lexer:
-    _instance = None
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(Lexer, cls).__new__(cls)
-        return cls._instance
-
-    def __init__(self):
-        # Inicializar solo una vez para preservar el estado de singleton.
-        if not hasattr(self, '_initialized'):
-            self.state_table = states_table
-            self.final_states = final_states
-            self.rewind_states = rewind_states
-            self.initial_state = 0
-            self._initialized = True
-
-    def get_char_column(self, a: str) -> int:
-        for column, chars in char_map.items():
-            if a in chars:
-                return column
-        return len(char_map)
+    engines = ("dfa", "regex", "numpy")
+
+    def __init__(self, programa, posicion=0, progLong=None, engine="dfa", on_error=None,
+                 symbols=None):
+        """
+        Crea un analizador léxico para 'programa'. Cada instancia guarda su propio
+        cursor, por lo que varios programas pueden
+        analizarse a la vez, incluso desde distintos hilos.
+
+        Args:
+            programa (str): Código fuente (opcionalmente terminado en '$').
+            posicion (int, optional): Índice inicial en la cadena. Defaults to 0.
+            progLong (int, optional): Longitud del programa sin el '$' final. Defaults to len(programa).
+            engine (str, optional): Motor de análisis: "dfa" (LexerStatesTable), "regex" (patrón maestro)
+                o "numpy" (clasificación vectorizada, requiere numpy). Defaults to "dfa".
+            on_error (callable, optional): Función (posición, lexema) que recibe cada token
+                inválido. Defaults to report_error (el destino de diagnósticos).
+            symbols (SymbolTable, optional): Tabla donde se internan los identificadores.
+                Defaults to una tabla nueva, propia de este programa.
+        """
+        if engine not in self.engines:
+            raise ValueError(f"Motor léxico desconocido: {engine}")
+        if engine == "regex":
+            self.get_span = self.get_span_regex
+        elif engine == "numpy":
+            self.get_span = self.get_span_numpy
+            self.numpy_tokens = None
+
+        self.final_states = final_states
+        self.rewind_states = rewind_states
+        self.initial_state = initial_state
+
+        self.on_error = on_error
+        self.symbols = SymbolTable() if symbols is None else symbols
+        self.programa = programa
+        self.posicion = posicion    # Índice actual en la cadena
+        self.progLong = len(programa) if progLong is None else progLong
+        # Índice de inicio de cada línea, para calcular línea y columna solo cuando se necesitan
+        self.line_starts = compute_line_starts(programa)
+        # Clasificar todo el programa de una sola vez (una columna por carácter).
+        # El motor 'numpy' hace esta clasificación en tokenize_numpy.
+        if engine != "numpy":
+            self.clases = programa.translate(char_classes).encode('latin-1')
 
     def check_reserved_word(self, lex: str, token: TokenType):
         """
@@ -45,84 +111,86 @@ class Lexer:
             return resreved_words[lex]
         return token
 
+    def lexeme(self, token, start, end):
+        """
+        Devuelve el texto de un token a partir de su intervalo [start, end) en 'programa'.
+        El texto solo se copia cuando algún consumidor lo solicita. Los identificadores se
+        internan en self.symbols, así que todas sus apariciones comparten la misma cadena.
+        """
+        if token is None:
+            return None
+        if token == TK.ENDFILE:
+            return "$"
+        if token == TK.ID:
+            return self.symbols.canonical(self.programa[start:end])
+        return self.programa[start:end]
+
+    def line_column(self, offset):
+        """
+        Devuelve la línea y columna (desde 1) del carácter en 'offset', usando el índice
+        de inicios de línea construido una sola vez para el programa.
+        """
+        return line_column(self.line_starts, offset)
+
     def get_token(self, return_eof=True):
         """
-        Devuelve el siguiente token desde el 'programa' global comenzando en 'posicion'
+        Devuelve el siguiente token como una tupla (token, lexema, línea, columna).
+        Es equivalente a get_span, pero copia el lexema y calcula la línea y columna del token.
+        """
+        token, start, end = self.get_span(return_eof)
+        line, column = self.line_column(start)
+        return token, self.lexeme(token, start, end), line, column
+
+    def get_span(self, return_eof=True, on_error=None):
+        """
+        Devuelve el siguiente token desde 'programa' comenzando en 'posicion'
         usando una estrategia de máxima absorción, ignorando espacios, tabulaciones y saltos de línea iniciales.
         También ignora comentarios en formato /* ... */
 
-        Devuelve una tupla (token, lexema, línea, columna) donde:
+        Devuelve una tupla (token, inicio, fin) donde:
         - token: un miembro de TokenType (o un miembro de ReservedWords si el lexema coincide),
                  o TokenType.ERROR si se encuentra un error.
-        - lexema: la subcadena que constituye el token, con espacios extra eliminados.
-        - línea: número de línea donde comienza el token.
-        - columna: número de columna donde comienza el token.
+        - inicio, fin: intervalo [inicio, fin) del lexema dentro de 'programa', sin espacios extra.
+          El lexema no se copia; se obtiene con lexeme(token, inicio, fin), y la línea y
+          columna del token con line_column(inicio).
 
-        La variable global 'posicion' se actualiza al índice inmediatamente después del token.
+        El atributo 'posicion' se actualiza al índice inmediatamente después del token.
         Si no se encuentra ningún token o se alcanza el marcador de fin ('$') al inicio (después de espacios),
-        y return_eof es True, entonces devuelve (TokenType.ENDFILE, "$", línea, columna).
+        y return_eof es True, entonces devuelve (TokenType.ENDFILE, i, i).
+
+        Los tokens inválidos se reportan a 'on_error' si se proporciona, o si no al
+        'on_error' del analizador.
         """
-        global programa, posicion, progLong, current_line, current_column
+        programa = self.programa
+        progLong = self.progLong
+        clases = self.clases
+        skip_whitespace = whitespace_pattern.match
+        i = self.posicion
 
         # Procesar comentarios o espacios hasta encontrar un token válido
         while True:
-            i = posicion
-            token_line = current_line
-            token_column = current_column
-
             # Saltar espacios en blanco iniciales (espacios, tabulaciones, saltos de línea)
-            while i < progLong and programa[i] in (' ', '\t', '\n'):
-                if programa[i] == '\n':
-                    current_line += 1
-                    current_column = 1
-                else:
-                    current_column += 1
-                i += 1
-            posicion = i
-
-            # Actualizar posición de inicio del token después de los espacios
-            token_line = current_line
-            token_column = current_column
+            i = skip_whitespace(programa, i, progLong).end()
 
             # Manejar marcador de fin después de espacios.
             if i < progLong and programa[i] == '$':
-                posicion = i
+                self.posicion = i
                 if return_eof:
-                    return TokenType.ENDFILE, "$", token_line, token_column
+                    return TK.ENDFILE, i, i
                 else:
-                    return None, None, token_line, token_column
+                    return None, i, i
 
             # Verificar inicio de comentario /*
             if i + 1 < progLong and programa[i] == '/' and programa[i+1] == '*':
                 # Se encontró el inicio de un comentario
                 # Saltar hasta encontrar */
-                i += 2  # Saltar /*
-                current_column += 2
-                comment_closed = False
-
-                while i + 1 < progLong and not comment_closed:
-                    if programa[i] == '*' and programa[i+1] == '/':
-                        comment_closed = True
-                        i += 2  # Saltar */
-                        current_column += 2
-                    else:
-                        if programa[i] == '\n':
-                            current_line += 1
-                            current_column = 1
-                        else:
-                            current_column += 1
-                        i += 1
-
-                if not comment_closed and i < progLong:
-                    # Se alcanzó el final sin cerrar el comentario
-                    if programa[i] == '\n':
-                        current_line += 1
-                        current_column = 1
-                    else:
-                        current_column += 1
-                    i += 1  # Saltar último carácter
-
-                posicion = i
+                comment_end = programa.find('*/', i + 2, progLong)
+                if comment_end == -1:
+                    # Comentario sin cerrar: se ignora el resto del programa
+                    i = progLong
+                else:
+                    i = comment_end + 2  # Saltar */
+
                 # Continuar el bucle externo para encontrar el siguiente token
                 continue
 
@@ -130,110 +198,748 @@ class Lexer:
             break
 
         current_state = self.initial_state
-        lexema = ""
+        final_states = self.final_states
+        token_start = i
         last_final_state = None
-        last_final_lexema = ""
         last_final_index = -1
 
-        # Guardar la posición de inicio del token actual
-        token_start_line = current_line
-        token_start_column = current_column
-
         # Procesar caracteres usando máxima absorción (maximal munch)
         while i < progLong:
-            char = programa[i]
             # Detener si se encuentra el marcador de fin
-            if char == '$':
+            if programa[i] == '$':
                 break
 
-            column = self.get_char_column(char)
-            new_state = self.state_table[current_state][column]
+            # Transición en la tabla comprimida
+            k = base[current_state] + clases[i]
+            new_state = next_state[k] if check[k] == current_state else default[current_state]
 
             # Si la transición es inválida (estado de error), salir del bucle
-            if new_state == 8:
+            if new_state == error_state:
                 break
 
             current_state = new_state
-            lexema += char
-
-            # Actualizar posición actual
-            if char == '\n':
-                current_line += 1
-                current_column = 1
-            else:
-                current_column += 1
 
             # Si el estado actual es final, registrarlo
-            if current_state in self.final_states:
+            if current_state in final_states:
                 last_final_state = current_state
-                last_final_lexema = lexema
                 last_final_index = i
             i += 1
 
+        # El fin del programa termina el token igual que un espacio, pero sin consumirlo
+        at_end = i > token_start and (i == progLong or programa[i] == '$')
+        if at_end:
+            k = base[current_state] + space_column
+            end_state = next_state[k] if check[k] == current_state else default[current_state]
+            if end_state in final_states:
+                last_final_state = end_state
+                last_final_index = i
+            else:
+                at_end = False
+
         # Si se registró un estado final, tenemos un token válido
         if last_final_state is not None:
             # Si el estado final requiere retroceso, no consumir el carácter extra
-            if last_final_state in self.rewind_states:
-                last_final_lexema = last_final_lexema[:-1]
-                posicion = last_final_index
-
-                # Si retrocedemos, también hay que ajustar la posición actual
-                if programa[last_final_index] == '\n':
-                    # Esto es un caso especial que requeriría rastrear la columna anterior
-                    # Por simplicidad, ajustamos solo si el carácter no es un salto de línea
-                    current_column = 1  # Esto es una aproximación
-                else:
-                    current_column -= 1
+            if last_final_state in self.rewind_states or at_end:
+                token_end = last_final_index
+                self.posicion = last_final_index
             else:
-                posicion = last_final_index + 1
+                self.posicion = last_final_index + 1
+                # El carácter consumido después del operador puede ser un espacio
+                token_start, token_end = self.trim_span(token_start, self.posicion)
             token_type = self.final_states[last_final_state]
 
             # Si el token es un identificador, verificar si es una palabra reservada
-            if token_type == TokenType.ID:
+            if token_type == TK.ID:
                 token_type = self.check_reserved_word(
-                    last_final_lexema.strip(), token_type)
-            return token_type, last_final_lexema.strip(), token_start_line, token_start_column
+                    programa[token_start:token_end], token_type)
+            return token_type, token_start, token_end
         else:
-            # No se formó un token válido
-            if i < progLong:
+            # No se formó un token válido (tampoco si el programa termina a la mitad del token)
+            if i < progLong or i > token_start:
                 # Recoger caracteres hasta espacio o delimitador
                 error_start = i
 
                 # Continuar hasta encontrar espacio o delimitador
-                while i < progLong and programa[i] not in (' ', '\t', '\n', '$'):
-                    lexema += programa[i]
-                    if programa[i] == '\n':
-                        current_line += 1
-                        current_column = 1
-                    else:
-                        current_column += 1
-                    i += 1
-
-                posicion = i
-                print("Error: Token invalido en la posición ",
-                      error_start, "=>", lexema.strip())
-                return TokenType.ERROR, lexema.strip(), token_start_line, token_start_column
+                i = error_pattern.match(programa, i, progLong).end()
+
+                self.posicion = i
+                token_start, token_end = self.trim_span(token_start, i)
+                report = on_error or self.on_error or self.report_error
+                report(error_start, programa[token_start:token_end])
+                return TK.ERROR, token_start, token_end
             else:
-                posicion = i
+                self.posicion = i
                 if return_eof:
-                    return TokenType.ENDFILE, "$", token_start_line, token_start_column
+                    return TK.ENDFILE, i, i
                 else:
-                    return None, None, token_start_line, token_start_column
+                    return None, i, i
+
+    def get_span_regex(self, return_eof=True, on_error=None):
+        """
+        Igual que get_span, pero reconoce los tokens con master_pattern para que el módulo
+        're' haga el recorrido en C. Si el patrón no coincide en la posición actual
+        (token inválido, comentario sin cerrar o fin del programa), se delega en el DFA.
+        """
+        programa = self.programa
+        progLong = self.progLong
+        match = master_pattern.match
+        i = self.posicion
+
+        while True:
+            m = match(programa, i, progLong)
+            if m is None:
+                self.posicion = i
+                return Lexer.get_span(self, return_eof, on_error)
+
+            name = m.lastgroup
+            if name == "SKIP":
+                i = m.end()
+                continue
+
+            if name == "ENDFILE":
+                self.posicion = i
+                if return_eof:
+                    return TK.ENDFILE, i, i
+                return None, i, i
+
+            end = m.end()
+            self.posicion = end
+            if name == "ID":
+                return resreved_words.get(programa[i:end], TK.ID), i, end
+            if name == "MAYOR" or name == "MENOR":
+                # El operador consume el carácter siguiente, que puede ser un espacio
+                return (pattern_tokens[name],) + self.trim_span(i, end)
+            return pattern_tokens[name], i, end
+
+    def get_span_numpy(self, return_eof=True, on_error=None):
+        """
+        Igual que get_span, pero la primera llamada analiza todo el programa con
+        tokenize_numpy y las siguientes solo recorren los tokens ya calculados.
+        Los errores léxicos se reportan al devolver el token correspondiente.
+        """
+        if self.numpy_tokens is None:
+            errors = {}
+            self.numpy_tokens = self.tokenize_numpy(
+                lambda index, position, lexema: errors.setdefault(index, (position, lexema)))
+            self.numpy_errors = errors
+            self.numpy_index = 0
+        kind, start, end = self.numpy_tokens
+        i = self.numpy_index
+        if i < len(kind) - 1:
+            self.numpy_index = i + 1
+            self.posicion = end[i]
+        else:
+            self.posicion = start[i]
+        if i in self.numpy_errors:
+            report = on_error or self.on_error or self.report_error
+            report(*self.numpy_errors.pop(i))
+        token = token_types[kind[i]]
+        if token == TK.ENDFILE and not return_eof:
+            token = None
+        return token, start[i], end[i]
+
+    def tokenize_numpy(self, report=None):
+        """
+        Analiza todo el programa desde 'posicion' con operaciones vectorizadas de numpy.
+
+        El programa se carga como un arreglo uint8 y se clasifica completo con char_classes.
+        Con diferencias entre posiciones vecinas se obtienen los inicios candidatos de token
+        y, con búsquedas binarias sobre los fines de cada racha, el token que el DFA
+        reconocería en cada candidato: identificadores, números y símbolos de un carácter.
+        Los candidatos contiguos (separados solo por espacios y comentarios) se aceptan en
+        bloque; el DFA solo se recorre en los operadores de varios caracteres ('<=', '==',
+        '!=', ...), en tokens inválidos y al final del programa, hasta volver a coincidir
+        con un candidato.
+
+        Args:
+            report (callable, optional): Función (índice del token, posición, lexema) que recibe
+                cada token inválido. Defaults to on_error del analizador o report_error.
+
+        Returns:
+            tuple: Columnas array('i') (kind, start, end), terminando en ENDFILE.
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("El motor léxico 'numpy' requiere el paquete numpy") from None
+
+        programa = self.programa
+        n = self.progLong
+        first = self.posicion
+        column = char_classes.__getitem__
+
+        # Clasificar todo el programa de una sola vez. Los caracteres fuera de ASCII se
+        # convierten en '?', que como ellos pertenece a la columna OTHER.
+        chars = np.frombuffer(programa[:n].encode('ascii', 'replace'), dtype=np.uint8)
+        clases = np.array([column(c) for c in range(128)], dtype=np.uint8)[chars]
+        self.clases = clases.tobytes()
+        letter = clases == column(ord('a'))
+        digit = clases == column(ord('0'))
+        dot = clases == column(ord('.'))
+        dollar = chars == ord('$')
+        word = letter | digit
+        skip = (chars == ord(' ')) | (chars == ord('\t')) | (chars == ord('\n'))
+
+        # Comentarios: cada '/*' fuera de otro comentario abre uno hasta el siguiente '*/'
+        bounds = []
+        i = programa.find('/*', first, n)
+        while i != -1:
+            j = programa.find('*/', i + 2, n)
+            j = n if j == -1 else j + 2
+            bounds.append((i, j))
+            i = programa.find('/*', j, n)
+        if bounds:
+            bounds = np.array(bounds)
+            changes = (np.bincount(bounds[:, 0], minlength=n + 1)
+                       - np.bincount(bounds[:, 1], minlength=n + 1))
+            skip |= np.cumsum(changes[:n], dtype=np.int32) > 0
+
+        # Inicios de racha: el carácter anterior no pertenece a la misma racha
+        prev_word = np.zeros(n, dtype=bool)
+        prev_word[1:] = word[:-1]
+        prev_digit = np.zeros(n, dtype=bool)
+        prev_digit[1:] = digit[:-1]
+        prev_dot = np.zeros(n, dtype=bool)
+        prev_dot[1:] = dot[:-1]
+        next_star = np.zeros(n, dtype=bool)
+        next_star[:-1] = chars[1:] == ord('*')
+
+        single = np.zeros(128, dtype=np.int32)
+        for char, token in single_char_tokens.items():
+            single[ord(char)] = token.value
+        single_kind = single[chars]
+        single_kind[(chars == ord('/')) & next_star] = 0
+
+        candidate = ~skip & (
+            (letter & ~prev_word) | (digit & ~prev_word & ~prev_dot) | (dot & ~prev_digit)
+            | (single_kind != 0) | ~(word | dot))
+        candidate[:first] = False
+        # Inicio S, fin E y código K del token de cada candidato (-1 si lo resuelve el DFA)
+        S = np.flatnonzero(candidate)
+        E = S + 1
+        K = np.full(len(S), -1, dtype=np.int64)
+
+        def run_end(outside, positions):
+            """Primera posición >= positions cuyo carácter no pertenece a la racha ('outside' termina en n)"""
+            return outside[np.searchsorted(outside, positions)]
+
+        def lookahead(run):
+            """El token termina en 'run' solo si hay un carácter siguiente distinto de '$'"""
+            valid = run < n
+            valid[valid] = ~dollar[run[valid]]
+            return valid
+
+        no_word = np.append(np.flatnonzero(~word), n)
+        no_digit = np.append(np.flatnonzero(~digit), n)
+
+        idx = np.flatnonzero(single_kind[S] != 0)
+        K[idx] = single_kind[S[idx]]
+
+        idx = np.flatnonzero(letter[S])
+        run = run_end(no_word, S[idx])
+        ok = lookahead(run)
+        E[idx[ok]] = run[ok]
+        K[idx[ok]] = TokenType.ID.value
+
+        # Números: ENTERO (dígitos) o REAL (dígitos opcionales, punto y al menos un dígito)
+        idx = np.flatnonzero(digit[S] | dot[S])
+        int_end = run_end(no_digit, S[idx])
+        int_end[dot[S[idx]]] = S[idx][dot[S[idx]]]
+        has_dot = int_end < n
+        has_dot[has_dot] = dot[int_end[has_dot]]
+        frac_end = run_end(no_digit, np.minimum(int_end + 1, n))
+        real = has_dot & (frac_end > int_end + 1) & lookahead(frac_end)
+        is_int = ~has_dot & lookahead(int_end)
+        is_int[is_int] = ~letter[int_end[is_int]]
+        E[idx[real]] = frac_end[real]
+        K[idx[real]] = TokenType.REAL.value
+        E[idx[is_int]] = int_end[is_int]
+        K[idx[is_int]] = TokenType.ENTERO.value
+
+        # Un candidato continúa en bloque si después de sus espacios y comentarios sigue el próximo
+        no_skip = np.append(np.flatnonzero(~skip), n)
+        resume = run_end(no_skip, E)
+        contiguous = np.zeros(len(S), dtype=bool)
+        contiguous[:-1] = (K[:-1] != -1) & (resume[:-1] == S[1:])
+        breaks = array('i', np.flatnonzero(~contiguous).astype(np.int32).tobytes())
+        cand_start = array('i', S.astype(np.int32).tobytes())
+        cand_kind = array('i', K.astype(np.int32).tobytes())
+        block_kind = K.astype(np.int32)
+        block_start = S.astype(np.int32)
+        block_end = E.astype(np.int32)
+
+        kind = array('i')
+        start = array('i')
+        end = array('i')
+        endfile = TokenType.ENDFILE
+        error = TokenType.ERROR
+        if report is None:
+            report_error = self.on_error or self.report_error
+            report = lambda index, position, lexema: report_error(position, lexema)
+        errors = []
+        # Los errores del DFA se guardan para reportarlos con el índice de su token
+        capture = lambda position, lexema: errors.append((position, lexema))
+        while True:
+            token, token_start, token_end = Lexer.get_span(self, True, capture)
+            j = bisect_left(cand_start, token_start)
+            # Un token inválido puede empezar en un candidato después de recortar espacios
+            if (token != error and j < len(cand_start) and cand_start[j] == token_start
+                    and cand_kind[j] != -1):
+                # El DFA volvió a un candidato: aceptar el bloque hasta el próximo corte
+                cut = breaks[bisect_left(breaks, j)]
+                last = cut + 1 if cand_kind[cut] != -1 else cut
+                kind.frombytes(block_kind[j:last].tobytes())
+                start.frombytes(block_start[j:last].tobytes())
+                end.frombytes(block_end[j:last].tobytes())
+                self.posicion = end[-1] if last > cut else cand_start[cut]
+                continue
+            if errors:
+                report(len(kind), *errors.pop())
+            kind.append(token.value)
+            start.append(token_start)
+            end.append(token_end)
+            if token == endfile:
+                break
+
+        # Palabras reservadas entre los identificadores
+        kind_np = np.frombuffer(kind, dtype=np.int32).copy()
+        start_np = np.frombuffer(start, dtype=np.int32)
+        length = np.frombuffer(end, dtype=np.int32) - start_np
+        ids = kind_np == TokenType.ID.value
+        for word_text, token in resreved_words.items():
+            idx = np.flatnonzero(ids & (length == len(word_text)))
+            for k, char in enumerate(word_text.encode('ascii')):
+                idx = idx[chars[start_np[idx] + k] == char]
+            kind_np[idx] = token.value
+        return array('i', kind_np.tobytes()), start, end
+
+    def report_error(self, position, lexema):
+        """Envía el mensaje de un token inválido al destino de diagnósticos"""
+        emit("Error: Token invalido en la posición ", position, "=>", lexema)
+
+    def trim_span(self, start, end):
+        """
+        Excluye del intervalo [start, end) los espacios en blanco de los extremos,
+        igual que str.strip() sobre el lexema.
+        """
+        programa = self.programa
+        while start < end and programa[start].isspace():
+            start += 1
+        while end > start and programa[end - 1].isspace():
+            end -= 1
+        return start, end
+
+
+class TokenStream:
+    """
+    Secuencia completa de tokens de un programa guardada como columnas paralelas
+    array('i'): código del token e inicio y fin del lexema. El token i se describe por
+    kind[i], start[i] y end[i]; el último token siempre es ENDFILE. Las columnas
+    line y column (y el índice de inicios de línea, si no se proporciona) se calculan
+    la primera vez que se consultan. Los identificadores se internan en 'symbols', la
+    tabla del programa.
+    """
+
+    def __init__(self, programa, line_starts=None, progLong=None, symbols=None):
+        self.programa = programa
+        self.symbols = SymbolTable() if symbols is None else symbols
+        self.progLong = len(programa) if progLong is None else progLong
+        self._line_starts = line_starts
+        self.kind = array('i')
+        self.start = array('i')
+        self.end = array('i')
+        self._line = None
+        self._column = None
+
+    def __len__(self):
+        return len(self.kind)
+
+    @property
+    def line_starts(self):
+        if self._line_starts is None:
+            self._line_starts = compute_line_starts(self.programa)
+        return self._line_starts
+
+    def __getitem__(self, i):
+        """Devuelve el token i como la tupla (token, lexema, línea, columna) de get_token"""
+        token = token_types[self.kind[i]]
+        return (token, self.lexeme(i)) + self.line_column(self.start[i])
+
+    @property
+    def line(self):
+        if self._line is None:
+            self._compute_lines()
+        return self._line
+
+    @property
+    def column(self):
+        if self._column is None:
+            self._compute_lines()
+        return self._column
+
+    def _compute_lines(self):
+        line_starts = self.line_starts
+        self._line = array('i', [bisect_right(line_starts, start) for start in self.start])
+        self._column = array('i', [start - line_starts[line - 1] + 1
+                                   for start, line in zip(self.start, self._line)])
+
+    def line_column(self, offset):
+        return line_column(self.line_starts, offset)
+
+    def token(self, i):
+        return token_types[self.kind[i]]
+
+    def lexeme(self, i):
+        if self.kind[i] == TK.ENDFILE.value:
+            return "$"
+        if self.kind[i] == TK.ID.value:
+            return self.symbols.canonical(self.programa[self.start[i]:self.end[i]])
+        return self.programa[self.start[i]:self.end[i]]
+
+    def reader(self, first=0, last=None):
+        """Devuelve un lector con la interfaz de Lexer (get_span/lexeme/line_column) para los
+        tokens de 'first' a 'last' - 1; en 'last' (por omisión, el ENDFILE) el lector termina"""
+        return TokenReader(self, first, last)
+
+
+class TokenReader:
+    """Recorre un TokenStream con la misma interfaz que Lexer, para usarlo desde Parser"""
+
+    def __init__(self, stream, index=0, last=None):
+        self.stream = stream
+        self.programa = stream.programa
+        self.symbols = stream.symbols
+        self.index = index
+        self.last = len(stream.kind) - 1 if last is None else last
+
+    def lexeme(self, token, start, end):
+        if token is None:
+            return None
+        if token == TK.ENDFILE:
+            return "$"
+        if token == TK.ID:
+            return self.symbols.canonical(self.programa[start:end])
+        return self.programa[start:end]
+
+    @property
+    def line_starts(self):
+        return self.stream.line_starts
+
+    def line_column(self, offset):
+        return line_column(self.stream.line_starts, offset)
+
+    def get_span(self, return_eof=True):
+        stream = self.stream
+        i = self.index
+        if i < self.last:
+            self.index = i + 1
+            return token_types[stream.kind[i]], stream.start[i], stream.end[i]
+        # Al llegar al límite se devuelve ENDFILE indefinidamente, en la posición del límite
+        return TK.ENDFILE, stream.start[i], stream.end[i]
+
+
+def compute_line_starts(programa):
+    """Devuelve el índice de inicio de cada línea del programa como array('i')"""
+    return array('i', accumulate(
+        map(len, programa.split('\n')), lambda start, n: start + n + 1, initial=0))
+
+
+def line_column(line_starts, offset):
+    """
+    Devuelve la línea y columna (desde 1) del carácter en 'offset' a partir del índice
+    de inicios de línea del programa.
+    """
+    line = bisect_right(line_starts, offset)
+    return line, offset - line_starts[line - 1] + 1
+
+
+def tokenize_all(programa, posicion=0, progLong=None, engine="dfa", on_error=None):
+    """
+    Analiza el programa completo de una sola vez.
+
+    Args:
+        programa (str): Código fuente (opcionalmente terminado en '$').
+        posicion (int, optional): Índice inicial en la cadena. Defaults to 0.
+        progLong (int, optional): Longitud del programa sin el '$' final. Defaults to len(programa).
+        engine (str, optional): Motor de análisis ("dfa", "regex" o "numpy"). Defaults to "dfa".
+        on_error (callable, optional): Función (posición, lexema) que recibe cada token
+            inválido. Defaults to el destino de diagnósticos.
+
+    Returns:
+        TokenStream: Todos los tokens del programa, terminando en ENDFILE.
+    """
+    lexer = Lexer(programa, posicion, progLong, engine, on_error)
+    stream = TokenStream(programa, lexer.line_starts, lexer.progLong, lexer.symbols)
+    if engine == "numpy":
+        stream.kind, stream.start, stream.end = lexer.tokenize_numpy()
+        return stream
+    get_span = lexer.get_span
+    kind = stream.kind.append
+    start = stream.start.append
+    end = stream.end.append
+    endfile = TokenType.ENDFILE
+
+    token = None
+    while token != endfile:
+        token, token_start, token_end = get_span()
+        kind(token.value)
+        start(token_start)
+        end(token_end)
+    return stream
+
+
+# Analizador léxico de cada proceso de tokenize_parallel, creado por init_chunk_lexer
+chunk_lexer = None
+
+
+def init_chunk_lexer(lexer):
+    """Guarda el analizador léxico del proceso; el programa se recibe una sola vez por proceso"""
+    global chunk_lexer
+    chunk_lexer = lexer
+
+
+def lex_chunk(first, limit):
+    """
+    Analiza especulativamente un fragmento: empieza en 'first' como si ahí iniciara un token
+    y se detiene antes del primer token que empieza en 'limit' o después.
+
+    Returns:
+        tuple: (kind, start, end, posición final, errores), donde la posición final es
+        'posicion' después del último token y errores es una lista de
+        (índice del token, posición, lexema).
+    """
+    lexer = chunk_lexer
+    lexer.posicion = first
+    kind = array('i')
+    start = array('i')
+    end = array('i')
+    errors = []
+    capture = lambda position, lexema: errors.append((len(kind), position, lexema))
+    endfile = TokenType.ENDFILE
+
+    posicion = first
+    while True:
+        token, token_start, token_end = lexer.get_span(True, capture)
+        if token_start >= limit and token != endfile:
+            break
+        kind.append(token.value)
+        start.append(token_start)
+        end.append(token_end)
+        posicion = lexer.posicion
+        if token == endfile:
+            break
+    # Un error del token descartado no pertenece a este fragmento
+    errors = [error for error in errors if error[0] < len(kind)]
+    return kind, start, end, posicion, errors
+
+
+def tokenize_parallel(programa, posicion=0, progLong=None, engine="dfa",
+                      processes=None, chunk_size=1 << 22, on_error=None):
+    """
+    Analiza el programa completo dividiéndolo en fragmentos que se analizan en un grupo de procesos.
+
+    Cada fragmento se analiza de forma especulativa desde su primer carácter, aunque ese
+    carácter esté dentro de un comentario o a la mitad de un token. Al unir los resultados,
+    el final real del fragmento anterior se vuelve a analizar en secuencia con get_span hasta
+    producir un token que empieza en la misma posición que un token del fragmento siguiente.
+    Como el analizador no guarda estado entre tokens, a partir de ahí los tokens
+    especulativos son exactamente los de un análisis secuencial.
+
+    Args:
+        programa (str): Código fuente (opcionalmente terminado en '$').
+        posicion (int, optional): Índice inicial en la cadena. Defaults to 0.
+        progLong (int, optional): Longitud del programa sin el '$' final. Defaults to len(programa).
+        engine (str, optional): Motor de análisis de cada proceso ("dfa" o "regex"). Defaults to "dfa".
+        processes (int, optional): Número de procesos. Defaults to os.cpu_count().
+        chunk_size (int, optional): Caracteres por fragmento. Defaults to 4 MiB.
+        on_error (callable, optional): Función (posición, lexema) que recibe cada token
+            inválido, en orden. Defaults to el destino de diagnósticos.
+
+    Returns:
+        TokenStream: Los mismos tokens que tokenize_all, terminando en ENDFILE.
+    """
+    from multiprocessing import Pool
+
+    if engine not in ("dfa", "regex"):
+        raise ValueError(f"Motor léxico no disponible en paralelo: {engine}")
+    progLong = len(programa) if progLong is None else progLong
+    bounds = list(range(posicion, progLong, chunk_size))[1:]
+    if not bounds:
+        return tokenize_all(programa, posicion, progLong, engine, on_error)
+
+    # El analizador (con el programa ya clasificado) se comparte con los procesos; on_error
+    # no se le pasa porque los errores de cada fragmento se reportan aquí al unirlos
+    lexer = Lexer(programa, posicion, progLong, engine)
+    chunks = list(zip([posicion] + bounds, bounds + [progLong + 1]))
+    with Pool(processes, init_chunk_lexer, (lexer,)) as pool:
+        results = pool.starmap(lex_chunk, chunks)
+
+    stream = TokenStream(programa, lexer.line_starts, lexer.progLong, lexer.symbols)
+    kind, start, end = stream.kind, stream.start, stream.end
+    endfile = TokenType.ENDFILE.value
+    error = TokenType.ERROR
+    report_error = on_error or lexer.report_error
+
+    def append(result, first):
+        chunk_kind, chunk_start, chunk_end, _, errors = result
+        for index, position, lexema in errors:
+            if index >= first:
+                report_error(position, lexema)
+        kind.extend(chunk_kind[first:])
+        start.extend(chunk_start[first:])
+        end.extend(chunk_end[first:])
+
+    # El primer fragmento empieza donde empieza el análisis secuencial
+    append(results[0], 0)
+    lexer.posicion = results[0][3]
+    for (_, limit), result in zip(chunks[1:], results[1:]):
+        if kind and kind[-1] == endfile:
+            break
+        chunk_start = result[1]
+        # Volver a analizar desde el final real hasta coincidir con un token del fragmento
+        while True:
+            token, token_start, token_end = lexer.get_span(True, report_error)
+            j = bisect_left(chunk_start, token_start)
+            if (token != error and j < len(chunk_start) and chunk_start[j] == token_start
+                    and result[0][j] != error.value):
+                append(result, j)
+                lexer.posicion = result[3]
+                break
+            kind.append(token.value)
+            start.append(token_start)
+            end.append(token_end)
+            if token.value == endfile or token_start >= limit:
+                # Sin coincidencia: el fragmento se analizó completo en secuencia
+                break
+    return stream
+
+
+def relex(stream, offset, deleted, inserted, engine="dfa", window=4096, on_error=None):
+    """
+    Actualiza un TokenStream después de editar el programa, analizando solo la región editada.
+
+    El análisis se reinicia en el último token que termina antes de la edición (sin
+    tocar el carácter que el DFA lee después de él) y se detiene en el primer token, después
+    del texto insertado, que empieza en la misma posición (desplazada) y con el mismo
+    código que un token del flujo anterior. Como el analizador no guarda estado entre
+    tokens, los tokens restantes son los anteriores desplazados. Solo se clasifica una
+    ventana alrededor de la edición, que se agranda si no alcanza para sincronizar.
+
+    Costo: el análisis léxico es proporcional a la región editada, pero relex no es de tiempo
+    constante por edición. El resultado es un TokenStream nuevo (el anterior no se modifica,
+    porque IncrementalParser compara ambos), así que copiar el programa y las columnas y
+    sumar el desplazamiento a 'start' y 'end' de los tokens siguientes es lineal en el
+    tamaño del programa. La copia es de memoria en C; el desplazamiento, de un entero por
+    token, domina en programas grandes y se omite cuando la edición no cambia la longitud.
+    Quitar esa parte lineal requeriría posiciones relativas o un búfer con hueco en lugar
+    del programa contiguo y las posiciones absolutas que usan los motores del Lexer, el
+    analizador sintáctico y IncrementalParser.
+
+    Args:
+        stream (TokenStream): Tokens del programa antes de la edición.
+        offset (int): Posición de la edición en el programa anterior.
+        deleted (int): Número de caracteres borrados a partir de offset.
+        inserted (str): Texto insertado en offset.
+        engine (str, optional): Motor de análisis ("dfa" o "regex"). Defaults to "dfa".
+        window (int, optional): Caracteres que se clasifican después de la edición en el
+            primer intento. Defaults to 4096.
+        on_error (callable, optional): Función (posición, lexema) que recibe cada token
+            inválido de la región analizada. Defaults to el destino de diagnósticos.
+
+    Returns:
+        TokenStream: Tokens del programa editado, iguales a los de tokenize_all sobre él.
+    """
+    if not 0 <= offset <= offset + deleted <= stream.progLong:
+        raise ValueError("La edición está fuera del programa")
+    if engine not in ("dfa", "regex"):
+        raise ValueError(f"Motor léxico no disponible para análisis incremental: {engine}")
+
+    programa = stream.programa[:offset] + inserted + stream.programa[offset + deleted:]
+    delta = len(inserted) - deleted
+    progLong = stream.progLong + delta
+    edit_end = offset + len(inserted)
+    kind, start, end = stream.kind, stream.start, stream.end
+    error = TokenType.ERROR
+    endfile = TokenType.ENDFILE
+
+    # Último token que el DFA reconoce sin leer la región editada. Un token inválido
+    # no sirve como reinicio porque su inicio se recorta.
+    first = bisect_left(end, offset - 1) - 1
+    while first >= 0 and kind[first] == error.value:
+        first -= 1
+    if first < 0:
+        first = 0
+        lo = 0
+    else:
+        lo = start[first]
+    # Los tokens anteriores que empiezan después de la edición son candidatos de sincronización
+    old_first = bisect_left(start, offset + deleted)
+
+    while True:
+        hi = min(progLong, edit_end + window)
+        new_kind = array('i')
+        errors = []
+        capture = lambda position, lexema: errors.append((len(new_kind), position + lo, lexema))
+        lexer = Lexer(programa[lo:hi], 0, hi - lo, engine, capture, stream.symbols)
+        new_start = array('i')
+        new_end = array('i')
+        sync = None
+        while True:
+            token, token_start, token_end = lexer.get_span()
+            if hi < progLong and lexer.posicion >= hi - lo:
+                # El token podría continuar después de la ventana
+                break
+            token_start += lo
+            token_end += lo
+            if token != error and token_start >= edit_end:
+                j = bisect_left(start, token_start - delta, old_first)
+                if j < len(start) and start[j] == token_start - delta and kind[j] == token.value:
+                    sync = j
+                    break
+            new_kind.append(token.value)
+            new_start.append(token_start)
+            new_end.append(token_end)
+            if token == endfile:
+                sync = len(kind)
+                break
+        if sync is not None:
+            break
+        window *= 4
+
+    # Los errores de un token descartado al final de la ventana no se reportan
+    report_error = on_error or lexer.report_error
+    for index, position, lexema in errors:
+        if index < len(new_kind):
+            report_error(position, lexema)
+    # El programa editado conserva la tabla de identificadores del anterior
+    result = TokenStream(programa, None, progLong, stream.symbols)
+    result.kind = kind[:first] + new_kind + kind[sync:]
+    if delta:
+        result.start = start[:first] + new_start + array('i', map(delta.__add__, start[sync:]))
+        result.end = end[:first] + new_end + array('i', map(delta.__add__, end[sync:]))
+    else:
+        result.start = start[:first] + new_start + start[sync:]
+        result.end = end[:first] + new_end + end[sync:]
+    return result
+
+
+# Analizador léxico usado por las funciones de compatibilidad getToken/def_globales
+lexer_global = None
+
+
+def get_lexer():
+    """Devuelve el analizador léxico creado por la última llamada a def_globales"""
+    return lexer_global
 
 
 def getToken(imprimir=True):
-    lexer = Lexer()
-    token, tokenString, line, column = lexer.get_token(True)
+    """Devuelve el siguiente token de lexer_global; si 'imprimir' es True, lo envía al destino de diagnósticos"""
+    token, tokenString, line, column = lexer_global.get_token(True)
     if imprimir:
-        print(token, " = ", tokenString, " at line:", line, " column:", column)
+        emit(token, " = ", tokenString, " at line:", line, " column:", column)
     return token, tokenString, line, column
 
 
 def def_globales(prog, pos, long_):
-    global programa, posicion, progLong, current_line, current_column
-    programa = prog
-    posicion = pos
-    progLong = long_
-    current_line = 1
-    current_column = 1
-    # Crear la instancia singleton (si no existe aún)
+    global lexer_global
+    lexer_global = Lexer(prog, pos, long_)
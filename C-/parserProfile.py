@@ -0,0 +1,188 @@
+''' Perfil del analizador sintáctico por producción: llamadas, tokens, nodos y tiempo '''
+
+import inspect
+import json
+import sys
+import time
+
+from customParser import Parser
+from diagnostics import BufferedWriter, emit, set_sink
+from lexer import Lexer
+
+# Métodos de Parser que corresponden a una producción de la gramática
+productions = tuple(name for name in vars(Parser)
+                    if name.endswith("_tk") or name == "expression")
+
+# Columnas del reporte y de la salida JSON
+fields = ("calls", "tokens", "own_tokens", "nodes", "time", "own_time")
+
+
+class ProductionStats:
+    __slots__ = fields
+
+    def __init__(self):
+        self.calls = 0
+        self.tokens = 0       # tokens consumidos por la producción y las que llama
+        self.own_tokens = 0   # tokens consumidos directamente por la producción
+        self.nodes = 0        # nodos creados directamente con create_node
+        self.time = 0.0       # tiempo acumulado, incluyendo las producciones que llama
+        self.own_time = 0.0   # tiempo sin las producciones que llama
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in fields}
+
+
+class ProfilingParser(Parser):
+    """Parser que mide cada producción (los métodos en 'productions'). Los métodos se
+    envuelven solo en esta instancia, así que Parser y sus demás instancias no tienen
+    ningún costo adicional.
+
+    En una producción recursiva (por ejemplo stmt_decl_tk dentro de un if) 'tokens' y
+    'time' se cuentan solo en la llamada más externa, igual que el tiempo acumulado de
+    cProfile, para no contar dos veces el mismo trabajo.
+    """
+
+    def __init__(self, lexer=None, abstract=False, source_map=False, clock=time.perf_counter):
+        """
+        Args:
+            lexer (Lexer, optional): Analizador léxico del programa. Defaults to el creado por def_globales.
+            abstract (bool, optional): Construir el árbol abstracto (ver Parser). Defaults to False.
+            source_map (bool, optional): Guardar la posición de la puntuación (ver Parser). Defaults to False.
+            clock (callable, optional): Reloj en segundos. Defaults to time.perf_counter.
+        """
+        super().__init__(lexer, abstract, source_map)
+        self.clock = clock
+        self.stats = {name: ProductionStats() for name in productions}
+        self.consumed = 0
+        self.created = 0
+        self.elapsed = 0.0
+        # Pila de llamadas activas: [estadísticas, inicio, tokens al inicio, tiempo de las llamadas internas]
+        self.frames = []
+        self.active = dict.fromkeys(productions, 0)
+        for name in productions:
+            setattr(self, name, self.profiled(name, getattr(self, name)))
+
+    def profiled(self, name, method):
+        """Funcion para envolver el método de una producción y medir cada llamada
+
+        Args:
+            name (str): Nombre de la producción
+            method (callable): Método ligado a esta instancia
+
+        Returns:
+            callable: Método con las mismas entradas y salida que 'method'
+        """
+        stats = self.stats[name]
+        frames, active, clock = self.frames, self.active, self.clock
+
+        def enter():
+            stats.calls += 1
+            active[name] += 1
+            frame = [stats, clock(), self.consumed, 0.0]
+            frames.append(frame)
+            return frame
+
+        def leave(frame):
+            elapsed = clock() - frame[1]
+            frames.pop()
+            active[name] -= 1
+            stats.own_time += elapsed - frame[3]
+            if frames:
+                frames[-1][3] += elapsed
+            if not active[name]:
+                stats.time += elapsed
+                stats.tokens += self.consumed - frame[2]
+
+        if inspect.isgeneratorfunction(method):
+            # La producción se ejecuta con trampoline (ver Parser): el envoltorio también
+            # es un generador y deja pasar las llamadas que la producción entrega
+            def wrapper(*args, **kwargs):
+                frame = enter()
+                try:
+                    return (yield from method(*args, **kwargs))
+                finally:
+                    leave(frame)
+        else:
+            def wrapper(*args, **kwargs):
+                frame = enter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    leave(frame)
+
+        return wrapper
+
+    def match(self, token_arr, force=False):
+        if not super().match(token_arr, force):
+            return False
+        self.consumed += 1
+        if self.frames:
+            self.frames[-1][0].own_tokens += 1
+        return True
+
+    def create_node(self, token, lexema, val=0, no_line=False):
+        self.created += 1
+        if self.frames:
+            self.frames[-1][0].nodes += 1
+        return super().create_node(token, lexema, val, no_line)
+
+    def parser(self):
+        start = self.clock()
+        try:
+            return super().parser()
+        finally:
+            self.elapsed += self.clock() - start
+
+    def profile(self):
+        """Funcion para obtener el perfil en un diccionario, listo para guardarse como JSON
+
+        Returns:
+            dict: Totales del análisis y estadísticas de cada producción llamada al menos una vez
+        """
+        return {
+            "total": {"tokens": self.consumed, "nodes": self.created, "time": self.elapsed},
+            "productions": {name: stats.as_dict()
+                            for name, stats in self.stats.items() if stats.calls},
+        }
+
+    def report(self, key="time"):
+        """Funcion para escribir el perfil como tabla, ordenada de mayor a menor
+
+        Args:
+            key (str, optional): Columna por la que se ordena (una de 'fields'). Defaults to "time".
+        """
+        if key not in fields:
+            raise ValueError(f"columna desconocida: {key}")
+
+        total = self.elapsed or 1.0
+        emit(f"{'produccion':16} {'llamadas':>9} {'tokens':>9} {'propios':>9} {'nodos':>9} "
+             f"{'tiempo':>9} {'propio':>9} {'%':>6}")
+        for name, stats in sorted(self.stats.items(), key=lambda item: -getattr(item[1], key)):
+            if not stats.calls:
+                continue
+            emit(f"{name:16} {stats.calls:9} {stats.tokens:9} {stats.own_tokens:9} {stats.nodes:9} "
+                 f"{stats.time:9.4f} {stats.own_time:9.4f} {100 * stats.time / total:6.1f}")
+        emit(f"{'total':16} {'':9} {self.consumed:9} {'':9} {self.created:9} {self.elapsed:9.4f}")
+
+    def save(self, path):
+        """Funcion para guardar el perfil en un archivo JSON
+
+        Args:
+            path (str): Ruta del archivo
+        """
+        with open(path, "w") as f:
+            json.dump(self.profile(), f, indent=2)
+
+
+if __name__ == "__main__":
+    # Uso: python parserProfile.py programa.c- [columna] [salida.json]
+    salida = BufferedWriter()
+    set_sink(salida)
+    with open(sys.argv[1]) as f:
+        programa = f.read()
+    perfil = ProfilingParser(Lexer(programa + '$', 0, len(programa)))
+    perfil.parser()
+    perfil.report(sys.argv[2] if len(sys.argv) > 2 else "time")
+    if len(sys.argv) > 3:
+        perfil.save(sys.argv[3])
+    salida.flush()
@@ -3,6 +3,12 @@
 from globalTypes import *
 from customParser import *
 from analizer import *
+from diagnostics import BufferedWriter, emit, set_sink
+from astCache import ParseCache
+
+# Los diagnósticos del compilador se escriben en la terminal en bloques
+salida = BufferedWriter()
+set_sink(salida)
 
 f = open('sample.c-', 'r')
 programa = f.read()
@@ -13,17 +19,37 @@ posicion = 0  # lee todo el archivo a compilar
 # agregar un caracter $ que represente EOF
 # posición del caracter actual del string
 # función para pasar los valores iniciales de las variables globales
-globales(programa, posicion, progLong)
 
-ERROR = False
-AST, ERROR = parser(False)
+# Un programa sin cambios se carga de la caché de árboles en lugar de volver a analizarlo
+cache = ParseCache()
+simbolos = SymbolTable()
+AST = cache.load(programa[:progLong], simbolos, abstract=True)
+errores = []
+
+if AST is not None:
+    declaraciones = AST.child
+
+else:
+    # Cada declaración pasa al análisis semántico (y a la caché) en cuanto el analizador
+    # sintáctico la termina, sin construir el árbol completo del programa
+    globales(programa, posicion, progLong)
+    analizador = Parser(abstract=True)
+    simbolos = analizador.symbols
+    errores = analizador.errors
+    declaraciones = cache.stream(programa[:progLong], analizador)
+
+emit("---------------- Semantica ----------------")
+ERROR = semantica_stream(declaraciones, False, simbolos, errores)
 
+if errores:
+    ERROR = True
+    for error in errores:
+        emit(
+            f"Error: {error.errorMessage} en la posicion {error.line}:{error.column}, lexema inesperado '{error.lexema}'")
 
 if not ERROR:
-    print("---------------- Semantica ----------------")
-    ERROR = semantica(AST, False)
+    emit("---------------- Compilacion ----------------")
+    # Generar el código ensamblador
+    pass
 
-    if not ERROR:
-        print("---------------- Compilacion ----------------")
-        # Generar el código ensamblador
-        pass
+salida.flush()
@@ -0,0 +1,306 @@
+''' Generador de la tabla de transiciones del analizador léxico (LexerStatesTable.py) '''
+
+import re
+import sys
+
+from globalTypes import TokenType, CharMap, char_map
+
+# Especificación de los tokens de C-. Cada patrón es una secuencia de clases de char_map
+# (por su nombre en CharMap), conjuntos [A B] o complementos [^A B], con los
+# cuantificadores * y +. Los tokens marcados con retroceso terminan al leer un carácter
+# que no les pertenece, y ese carácter no forma parte del lexema.
+#
+#     (token, patrón, retroceso)
+token_spec = [
+    (TokenType.ENTERO, "DIGITS+ [^DIGITS DOT LETTERS]", True),
+    (TokenType.REAL, "DIGITS* DOT DIGITS+ [^DIGITS]", True),
+    (TokenType.ID, "LETTERS [LETTERS DIGITS]* [^LETTERS DIGITS]", True),
+    (TokenType.SUMA, "PLUS", False),
+    (TokenType.RESTA, "MINUS", False),
+    (TokenType.MULT, "MULT", False),
+    (TokenType.DIV, "DIV", False),
+    (TokenType.MAYORI, "GREATER EQUAL", False),
+    (TokenType.MAYOR, "GREATER [^EQUAL]", False),
+    (TokenType.MENORI, "LESS EQUAL", False),
+    (TokenType.MENOR, "LESS [^EQUAL]", False),
+    (TokenType.IGUAL, "EQUAL EQUAL", False),
+    (TokenType.NIGUAL, "EXCLAMATION EQUAL", False),
+    (TokenType.ASIGNAR, "[EQUAL EXCLAMATION] [^EQUAL]", True),
+    (TokenType.SEMICOLON, "SEMICOLON", False),
+    (TokenType.COMA, "COMA", False),
+    (TokenType.POPEN, "LPAREN", False),
+    (TokenType.PCLOSE, "RPAREN", False),
+    (TokenType.LLOPEN, "LBRACE", False),
+    (TokenType.LLCLOSE, "RBRACE", False),
+    (TokenType.BOPEN, "LBRACKET", False),
+    (TokenType.BCLOSE, "RBRACKET", False),
+]
+
+n_classes = len(char_map)
+class_columns = {CharMap(chars).name: column for column,
+                 chars in char_map.items() if chars}
+class_columns["OTHER"] = n_classes - 1
+element_pattern = re.compile(r"(\[\^?[^\]]*\]|\w+)([*+]?)")
+
+# Valor de 'check' para las casillas vacías de la tabla comprimida
+EMPTY = 255
+
+
+def parse_pattern(pattern):
+    """Funcion para convertir un patrón de token_spec en una lista de elementos
+
+    Args:
+        pattern (str): Patrón del token
+
+    Returns:
+        list: Lista de tuplas (conjunto de columnas, cuantificador)
+    """
+    elements = []
+    for item, quantifier in element_pattern.findall(pattern):
+        if item.startswith("["):
+            names = item.strip("[]^").split()
+            columns = {class_columns[name] for name in names}
+            if item.startswith("[^"):
+                columns = set(range(n_classes)) - columns
+        else:
+            columns = {class_columns[item]}
+        elements.append((frozenset(columns), quantifier))
+    return elements
+
+
+def build_nfa(spec):
+    """Funcion para construir un AFN con la unión de todos los patrones
+
+    Args:
+        spec (list): Especificación de tokens
+
+    Returns:
+        tuple: (transiciones, transiciones épsilon, estados de aceptación)
+        donde los estados de aceptación se asocian con el índice del token en spec
+    """
+    moves = {0: []}
+    epsilon = {0: []}
+    accepting = {}
+
+    def new_state():
+        state = len(moves)
+        moves[state] = []
+        epsilon[state] = []
+        return state
+
+    for index, (_, pattern, _) in enumerate(spec):
+        current = new_state()
+        epsilon[0].append(current)
+        for columns, quantifier in parse_pattern(pattern):
+            target = new_state()
+            if quantifier == "*":
+                epsilon[current].append(target)
+            else:
+                moves[current].append((columns, target))
+            if quantifier:
+                moves[target].append((columns, target))
+            current = target
+        accepting[current] = index
+
+    return moves, epsilon, accepting
+
+
+def closure(states, epsilon):
+    stack = list(states)
+    result = set(states)
+    while stack:
+        for target in epsilon[stack.pop()]:
+            if target not in result:
+                result.add(target)
+                stack.append(target)
+    return frozenset(result)
+
+
+def build_dfa(spec):
+    """Funcion para construir el AFD por el método de subconjuntos
+
+    Args:
+        spec (list): Especificación de tokens
+
+    Returns:
+        tuple: (filas de transiciones, etiqueta de cada estado) con el estado inicial en 0.
+        La etiqueta es el índice del token aceptado en spec, o None.
+    """
+    moves, epsilon, accepting = build_nfa(spec)
+    start = closure({0}, epsilon)
+    states = {start: 0}
+    pending = [start]
+    rows = []
+    labels = []
+
+    while pending:
+        subset = pending.pop(0)
+        row = []
+        for column in range(n_classes):
+            targets = {target for state in subset
+                       for columns, target in moves[state] if column in columns}
+            target = closure(targets, epsilon)
+            if target not in states:
+                states[target] = len(states)
+                pending.append(target)
+            row.append(states[target])
+        rows.append(row)
+        indexes = [accepting[state] for state in subset if state in accepting]
+        labels.append(min(indexes) if indexes else None)
+
+    return rows, labels, states[frozenset()]
+
+
+def minimize(rows, labels):
+    """Funcion para minimizar el AFD refinando particiones (algoritmo de Moore)
+
+    Args:
+        rows (list): Filas de transiciones
+        labels (list): Etiqueta de cada estado
+
+    Returns:
+        tuple: (filas, etiquetas, bloque de cada estado original) del AFD mínimo,
+        numerado en orden de recorrido desde el estado inicial
+    """
+    block = [labels.index(label) for label in labels]
+    while True:
+        signatures = {}
+        new_block = []
+        for state, row in enumerate(rows):
+            signature = (block[state], tuple(block[target] for target in row))
+            new_block.append(signatures.setdefault(signature, len(signatures)))
+        if len(signatures) == len(set(block)):
+            break
+        block = new_block
+
+    # Renumerar los bloques en orden de recorrido desde el estado inicial
+    order = {block[0]: 0}
+    pending = [0]
+    while pending:
+        state = pending.pop(0)
+        for target in rows[state]:
+            if block[target] not in order:
+                order[block[target]] = len(order)
+                pending.append(target)
+
+    min_rows = [None] * len(order)
+    min_labels = [None] * len(order)
+    for state, row in enumerate(rows):
+        if block[state] in order:
+            min_rows[order[block[state]]] = [order[block[target]] for target in row]
+            min_labels[order[block[state]]] = labels[state]
+    return min_rows, min_labels, [order.get(b) for b in block]
+
+
+def compress(rows, error_state):
+    """Funcion para comprimir la tabla con desplazamiento de filas y estado por omisión
+
+    La transición del estado s con la columna c se obtiene con:
+        k = base[s] + c
+        next_state[k] if check[k] == s else default[s]
+
+    Args:
+        rows (list): Filas de transiciones
+        error_state (int): Estado de error
+
+    Returns:
+        tuple: (base, default, next_state, check)
+    """
+    default = []
+    exceptions = []
+    for row in rows:
+        counts = {}
+        for target in row:
+            counts[target] = counts.get(target, 0) + 1
+        most_common = max(counts, key=lambda t: (counts[t], t == error_state))
+        default.append(most_common)
+        exceptions.append([(column, target) for column, target in enumerate(row)
+                           if target != most_common])
+
+    base = [0] * len(rows)
+    next_state = []
+    check = []
+    # Acomodar primero las filas con más excepciones
+    for state in sorted(range(len(rows)), key=lambda s: -len(exceptions[s])):
+        if not exceptions[state]:
+            continue
+        offset = 0
+        while any(offset + column < len(check) and check[offset + column] != EMPTY
+                  for column, _ in exceptions[state]):
+            offset += 1
+        for column, target in exceptions[state]:
+            while len(check) <= offset + column:
+                next_state.append(0)
+                check.append(EMPTY)
+            next_state[offset + column] = target
+            check[offset + column] = state
+        base[state] = offset
+
+    # Cualquier columna de cualquier fila debe caer dentro de los arreglos
+    size = max(base) + n_classes
+    next_state += [0] * (size - len(next_state))
+    check += [EMPTY] * (size - len(check))
+
+    for state, row in enumerate(rows):
+        for column, target in enumerate(row):
+            k = base[state] + column
+            assert (next_state[k] if check[k] == state else default[state]) == target
+    return base, default, next_state, check
+
+
+def generate(spec, path="LexerStatesTable.py"):
+    """Funcion para generar el módulo con la tabla de transiciones comprimida
+
+    Args:
+        spec (list): Especificación de tokens
+        path (str, optional): Archivo de salida. Defaults to "LexerStatesTable.py".
+
+    Returns:
+        tuple: (estados del AFD, estados del AFD mínimo, tamaño de la tabla comprimida)
+    """
+    rows, labels, dead = build_dfa(spec)
+    min_rows, min_labels, block = minimize(rows, labels)
+    error_state = block[dead]
+    assert len(min_rows) < EMPTY
+    base, default, next_state, check = compress(min_rows, error_state)
+
+    final_states = {state: spec[label][0] for state, label in enumerate(min_labels)
+                    if label is not None}
+    rewind_states = {state for state, label in enumerate(min_labels)
+                     if label is not None and spec[label][2]}
+
+    lines = [
+        "''' Archivo generado por tableGenerator.py a partir de token_spec. No editar a mano. '''",
+        "",
+        "from globalTypes import TokenType",
+        "",
+        f"initial_state = 0",
+        f"error_state = {error_state}",
+        "",
+        "final_states = {",
+    ]
+    lines += [f"    {state}: TokenType.{token.name},"
+              for state, token in sorted(final_states.items())]
+    lines += [
+        "}",
+        "",
+        f"rewind_states = {sorted(rewind_states)}".replace("[", "{").replace("]", "}"),
+        "",
+        "# Tabla de transiciones comprimida: la transición del estado s con la columna c es",
+        "# next_state[base[s] + c] si check[base[s] + c] == s, o default[s] en otro caso.",
+    ]
+    for name, values in (("base", base), ("default", default),
+                         ("next_state", next_state), ("check", check)):
+        lines.append(f"{name} = bytes({values})")
+
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+    return len(rows), len(min_rows), len(base) + len(default) + len(next_state) + len(check)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "LexerStatesTable.py"
+    estados, minimos, bytes_tabla = generate(token_spec, path)
+    print(f"AFD: {estados} estados, AFD mínimo: {minimos} estados, "
+          f"tabla comprimida: {bytes_tabla} bytes -> {path}")
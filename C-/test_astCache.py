@@ -0,0 +1,160 @@
+''' Pruebas del árbol compacto (AstArena) y de la caché de árboles en disco '''
+
+import os
+
+import pytest
+
+import astCache
+from astCache import ParseCache
+from customParser import Parser
+from diagnostics import MemoryWriter, set_sink
+from globalTypes import AstArena, ErrorNode, SymbolTable
+from lexer import Lexer
+
+PROGRAMA = """int x;
+int v[10];
+int suma(int a[], int n) { int i; i = 0; while (i < n) { x = x + a[i]; i = i + 1; } return x; }
+int main(void) { if (suma(v, 10) == 0) x = 1; else x = suma(v, x); return x; }
+"""
+
+
+@pytest.fixture(autouse=True)
+def sin_diagnosticos():
+    set_sink(MemoryWriter())
+
+
+def nodos(raiz, symbols):
+    """Funcion para obtener los nodos de un árbol en preorden, con el nombre de cada
+    identificador en lugar de su entero
+
+    Args:
+        raiz (TreeNode): Raíz del árbol
+        symbols (SymbolTable): Tabla de identificadores del árbol
+
+    Returns:
+        list: Los campos de cada nodo, o None para un hijo ausente
+    """
+    resultado = []
+    pila = [raiz]
+    while pila:
+        nodo = pila.pop()
+        if nodo is None:
+            resultado.append(None)
+        elif isinstance(nodo, ErrorNode):
+            resultado.append((nodo.token, nodo.lexema, nodo.line, nodo.column, nodo.errorMessage))
+        else:
+            nombre = None if nodo.symbol is None else symbols.name(nodo.symbol)
+            resultado.append((nodo.token, nodo.lexema, nodo.type, nodo.line, nodo.column, nombre,
+                              len(nodo.child or ())))
+            pila.extend(reversed(nodo.child or ()))
+    return resultado
+
+
+def analizar(programa, abstract=False):
+    """Funcion para analizar un programa sin pasar por la caché
+
+    Returns:
+        tuple: Raíz del árbol, errores de sintaxis y tabla de identificadores
+    """
+    analizador = Parser(Lexer(programa + '$', 0, len(programa)), abstract=abstract)
+    raiz, errores = analizador.parser()
+    return raiz, errores, analizador.symbols
+
+
+@pytest.mark.parametrize("abstract", [False, True], ids=["concreto", "abstracto"])
+@pytest.mark.parametrize("programa", [
+    PROGRAMA,
+    PROGRAMA.replace("x = x + a[i];", "x = x + a[i]").replace("int main(void)", "int main(void"),
+    "",
+], ids=["valido", "con-errores", "vacio"])
+def test_arena_ida_y_vuelta(programa, abstract):
+    raiz, _, symbols = analizar(programa, abstract)
+    arena = AstArena.from_tree(raiz)
+    assert len(arena) == len(nodos(raiz, symbols))
+    assert nodos(arena.to_tree(), symbols) == nodos(raiz, symbols)
+
+    # Otra tabla con identificadores previos: los enteros cambian, los nombres no
+    otra = SymbolTable()
+    otra.intern("previo")
+    copia = AstArena.from_bytes(arena.to_bytes(), otra)
+    assert nodos(copia.to_tree(), otra) == nodos(raiz, symbols)
+    assert copia.to_bytes() == AstArena.from_tree(copia.to_tree()).to_bytes()
+
+
+def test_arena_datos_invalidos():
+    raiz, _, _ = analizar(PROGRAMA)
+    datos = AstArena.from_tree(raiz).to_bytes()
+    with pytest.raises(ValueError):
+        AstArena.from_bytes(datos[:len(datos) // 2], SymbolTable())
+    with pytest.raises(ValueError):
+        AstArena.from_bytes(b"XAST" + datos[4:], SymbolTable())
+    # Un árbol escrito con otra versión del formato no se lee
+    otra_version = bytearray(datos)
+    otra_version[4] = AstArena.format_version + 1
+    with pytest.raises(ValueError):
+        AstArena.from_bytes(bytes(otra_version), SymbolTable())
+
+
+@pytest.mark.parametrize("abstract", [False, True], ids=["concreto", "abstracto"])
+def test_cache_guarda_y_carga(tmp_path, abstract):
+    cache = ParseCache(str(tmp_path))
+    raiz, _, symbols = analizar(PROGRAMA, abstract)
+    assert cache.load(PROGRAMA, SymbolTable(), abstract) is None
+
+    primero = SymbolTable()
+    arbol, errores = cache.parse(PROGRAMA, primero, abstract)
+    assert errores == []
+    assert os.listdir(tmp_path) == [os.path.basename(cache.path(PROGRAMA, abstract))]
+
+    segundo = SymbolTable()
+    cargado = cache.load(PROGRAMA, segundo, abstract)
+    assert nodos(cargado, segundo) == nodos(arbol, primero) == nodos(raiz, symbols)
+    # El otro modo no comparte el archivo
+    assert cache.load(PROGRAMA, SymbolTable(), not abstract) is None
+
+
+def test_cache_nueva_version_del_compilador(tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path))
+    cache.parse(PROGRAMA, SymbolTable())
+    assert cache.load(PROGRAMA, SymbolTable()) is not None
+
+    monkeypatch.setattr(astCache, "version", "otra versión del compilador")
+    assert cache.load(PROGRAMA, SymbolTable()) is None
+    _, errores = cache.parse(PROGRAMA, SymbolTable())
+    assert errores == [] and len(os.listdir(tmp_path)) == 2
+
+    # El archivo de la versión anterior sigue ahí, pero solo la versión que lo escribió lo lee
+    monkeypatch.undo()
+    assert cache.load(PROGRAMA, SymbolTable()) is not None
+
+
+def test_cache_programa_editado(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    cache.parse(PROGRAMA, SymbolTable())
+
+    editado = PROGRAMA.replace("x = 1;", "x = 2;")
+    assert cache.load(editado, SymbolTable()) is None
+    symbols = SymbolTable()
+    raiz, errores = cache.parse(editado, symbols)
+    esperado, _, tabla = analizar(editado)
+    assert errores == []
+    assert nodos(raiz, symbols) == nodos(esperado, tabla)
+    original = SymbolTable()
+    assert nodos(cache.load(PROGRAMA, original), original) != nodos(raiz, symbols)
+
+    # Un programa con errores de sintaxis no se guarda, así que sus errores se vuelven a reportar
+    roto = PROGRAMA.replace("x = 1;", "x = 1")
+    _, errores = cache.parse(roto, SymbolTable())
+    assert errores
+    assert cache.load(roto, SymbolTable()) is None
+    _, otra_vez = cache.parse(roto, SymbolTable())
+    assert len(otra_vez) == len(errores)
+
+
+def test_cache_archivo_danado(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    cache.parse(PROGRAMA, SymbolTable())
+    ruta = cache.path(PROGRAMA)
+    with open(ruta, "r+b") as f:
+        f.truncate(os.path.getsize(ruta) // 2)
+    assert cache.load(PROGRAMA, SymbolTable()) is None
@@ -0,0 +1,156 @@
+''' Pruebas del analizador léxico: los motores regex y numpy contra el DFA '''
+
+import os
+import random
+
+import pytest
+
+from benchmark import generate_source
+from diagnostics import MemoryWriter, set_sink
+from lexer import Lexer, tokenize_all, tokenize_parallel
+
+
+@pytest.fixture(autouse=True)
+def sin_diagnosticos():
+    set_sink(MemoryWriter())
+
+
+@pytest.fixture(params=Lexer.engines[1:])
+def engine(request):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    return request.param
+
+
+def tokens(programa, engine):
+    """Funcion para analizar un programa completo con un motor
+
+    Args:
+        programa (str): Código fuente, con o sin el '$' final
+        engine (str): Motor léxico
+
+    Returns:
+        tuple: (token, lexema, línea, columna) de cada token, y (posición, lexema) de cada
+            token inválido reportado
+    """
+    errores = []
+    stream = tokenize_all(programa, engine=engine,
+                          on_error=lambda posicion, lexema: errores.append((posicion, lexema)))
+    return [(stream.token(i), stream.lexeme(i), stream.line[i], stream.column[i])
+            for i in range(len(stream))], errores
+
+
+def test_programas_de_ejemplo(engine):
+    for archivo in ("sample.c-", "sample_2.c-", "error_sample.c-", "error_sample_2.c-"):
+        with open(os.path.join(os.path.dirname(__file__), archivo)) as f:
+            programa = f.read()
+        assert tokens(programa, engine) == tokens(programa, "dfa"), archivo
+
+
+@pytest.mark.parametrize("programa", [
+    "int x; @ y # z\n ñ € \x00 ~ `x` \\ ? . : ' \" $",
+    "x\r\ny\tz\x0b\x0c w",
+    "1abc 12 a1 _x 007",
+], ids=["fuera-de-clases", "espacios", "numeros"])
+def test_caracteres_fuera_de_las_clases(programa, engine):
+    resultado = tokens(programa, engine)
+    assert resultado == tokens(programa, "dfa")
+    assert resultado[1], "los caracteres sin clase se reportan como tokens inválidos"
+
+
+@pytest.mark.parametrize("programa", [
+    "int x; /* sin cerrar",
+    "int x; /* sin cerrar\n int y;$",
+    "int x; /* / * *$",
+    "int x; /*/ int y;",
+    "int x; /**/ int y; /* * / */ /",
+], ids=["sin-fin", "con-fin", "asteriscos", "barra", "cerrados"])
+def test_comentarios(programa, engine):
+    assert tokens(programa, engine) == tokens(programa, "dfa")
+
+
+@pytest.mark.parametrize("programa", [
+    "int main(void) { return 0; }",
+    "x = y <= 1",
+    "x = y !",
+    "",
+], ids=["programa", "operador", "admiracion", "vacio"])
+def test_sin_fin_de_programa(programa, engine):
+    resultado = tokens(programa, engine)
+    assert resultado == tokens(programa, "dfa")
+    # Sin '$' el análisis termina igual que con él
+    assert resultado == tokens(programa + "$", engine)
+    assert resultado[0][-1][1] == "$"
+
+
+def test_fin_a_la_mitad(engine):
+    programa = "int x;\nx = 1 $ y = 2;"
+    resultado = tokens(programa, engine)
+    assert resultado == tokens(programa, "dfa")
+    assert [lexema for _, lexema, _, _ in resultado[0]] == ["int", "x", ";", "x", "=", "1", "$"]
+
+
+def test_operadores(engine):
+    programa = "a/**/b<=!===>=<>!=/*x*/+-*/;,()[]{}<<==>>"
+    assert tokens(programa, engine) == tokens(programa, "dfa")
+
+
+def test_programa_generado(engine):
+    programa = generate_source(20, header_lines=3)
+    assert tokens(programa, engine) == tokens(programa, "dfa")
+
+
+def test_programas_aleatorios(engine):
+    # Fragmentos de tokens, comentarios y caracteres sin clase, unidos al azar
+    piezas = ["int", "void", "if", "else", "while", "return", "x", "abc1", "_", "0", "123",
+              "1x", "+", "-", "*", "/", "<", "<=", ">", ">=", "==", "!=", "=", "!", ";", ",",
+              "(", ")", "[", "]", "{", "}", "/*", "*/", " ", "\n", "\t", "@", "ñ", "\r"]
+    azar = random.Random(0)
+    for _ in range(300):
+        programa = "".join(azar.choice(piezas) for _ in range(azar.randint(0, 60)))
+        assert tokens(programa, engine) == tokens(programa, "dfa"), repr(programa)
+
+
+def mismos_tokens(programa, chunk_size, processes=2):
+    """Funcion para comparar tokenize_parallel con tokenize_all sobre un programa
+
+    Args:
+        programa (str): Código fuente
+        chunk_size (int): Caracteres por fragmento de tokenize_parallel
+        processes (int, optional): Número de procesos. Defaults to 2.
+    """
+    errores, esperados = [], []
+    paralelo = tokenize_parallel(programa, processes=processes, chunk_size=chunk_size,
+                                 on_error=lambda *error: errores.append(error))
+    secuencial = tokenize_all(programa, on_error=lambda *error: esperados.append(error))
+    for columna in ("kind", "start", "end", "line", "column"):
+        assert getattr(paralelo, columna) == getattr(secuencial, columna), (columna, chunk_size)
+    assert errores == esperados, chunk_size
+
+
+@pytest.mark.parametrize("programa, corte", [
+    ("int x; /* comentario int y; */ int z;$", "comentario"),
+    ("int x; /* abierto int y; int z;$", "abierto"),
+    ("int x; /*/ int y; */ int z;$", "/ int"),
+    ("x = a <= b; y = a != b; z = a == b;$", "<="),
+    ("x = a / b; /* c */ y = a */ b;$", "/ b"),
+    ("int variable_larga; variable_larga = 1;$", "variable_larga"),
+    ("int x; x = 1234567;$", "1234567"),
+    ("int x; @@@ x = 1abc;$", "@@"),
+], ids=["comentario", "comentario-sin-cerrar", "comentario-con-barra", "operador",
+        "division", "identificador", "entero", "errores"])
+def test_paralelo_cortes(programa, corte):
+    # El primer fragmento termina a la mitad del texto 'corte', y también cualquier otro
+    # tamaño de fragmento hasta todo el programa
+    mitad = programa.index(corte) + len(corte) // 2
+    mismos_tokens(programa, mitad)
+    for chunk_size in range(1, len(programa) + 1):
+        mismos_tokens(programa, chunk_size)
+
+
+@pytest.mark.parametrize("programa", ["", "$", "x", "x;", "/*", "<="],
+                         ids=["vacio", "fin", "id", "dos", "comentario", "operador"])
+def test_paralelo_programa_corto(programa):
+    # Menos caracteres que fragmentos y que procesos
+    mismos_tokens(programa, 1, processes=4)
+    mismos_tokens(programa, 1 << 22)
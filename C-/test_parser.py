@@ -0,0 +1,217 @@
+''' Pruebas del analizador sintáctico y del análisis semántico '''
+
+import pytest
+
+from analizer import semantica, semantica_stream
+from customParser import IncrementalParser, Parser, parse_parallel, print_tree
+from diagnostics import MemoryWriter, set_sink
+from globalTypes import TokenType
+from lexer import Lexer, tokenize_all
+
+
+def analizar(programa):
+    """Funcion para analizar un programa completo como run.py: las declaraciones con
+    errores de sintaxis no pasan al análisis semántico
+
+    Args:
+        programa (str): Código fuente sin el '$' final
+
+    Returns:
+        tuple: Errores de sintaxis y mensajes del análisis semántico
+    """
+    salida = MemoryWriter()
+    set_sink(salida)
+    analizador = Parser(Lexer(programa + '$', 0, len(programa)), abstract=True)
+    semantica_stream(analizador.declarations(valid_only=True), False, analizador.symbols,
+                     analizador.errors)
+    return analizador.errors, salida.getvalue()
+
+
+@pytest.mark.parametrize("cuerpo", [
+    "x = " + " + ".join(["x"] * 20000) + ";",
+    "x = " + "(" * 20000 + "x" + ")" * 20000 + ";",
+    "{ " * 20000 + "x = 1;" + " }" * 20000,
+    "if (x) " * 20000 + "x = 1;",
+    "if (x) x = 1; " + "else if (x) x = 1; " * 20000,
+    "while (x) " * 20000 + "x = 1;",
+    "x = " + "y[" * 20000 + "0" + "]" * 20000 + ";",
+    "x = " + "f(" * 20000 + "0" + ")" * 20000 + ";",
+    "x = " + "f(1, " * 20000 + "0" + ")" * 20000 + ";",
+], ids=["suma", "parentesis", "bloques", "if", "else-if", "while", "indices", "llamadas",
+        "argumentos"])
+def test_anidamiento_profundo(cuerpo):
+    programa = ("int x; int y[10]; int f(int a) { return a; }\n"
+                "int main(void) { " + cuerpo + " return 0; }\n")
+    set_sink(MemoryWriter())
+    raiz, errores = Parser(Lexer(programa + '$', 0, len(programa)), abstract=True).parser()
+    assert errores == []
+    assert [nodo.lexema for nodo in raiz.child] == ["x", "y", "f", "main"]
+
+
+def test_tabla_de_identificadores_por_compilacion():
+    primero = Parser(Lexer("int x; int y;$", 0, 13))
+    raiz, _ = primero.parser()
+    segundo = Parser(Lexer("int z;$", 0, 6))
+    otra, _ = segundo.parser()
+
+    assert primero.symbols is not segundo.symbols
+    assert primero.symbols.names == ["x", "y"]
+    assert segundo.symbols.names == ["z"]
+    assert [nodo.symbol for nodo in raiz.child] == [0, 1]
+    assert otra.child[0].symbol == 0
+
+
+@pytest.mark.parametrize("abstract", [False, True], ids=["concreto", "abstracto"])
+@pytest.mark.parametrize("argumento, error", [("v", False), ("x", True)],
+                         ids=["arreglo", "entero"])
+def test_parametro_arreglo(abstract, argumento, error):
+    programa = ("int v[10];\nint suma(int a[], int n) { return a[n]; }\n"
+                "int main(void) { int x; x = suma(" + argumento + ", 1); return 0; }\n")
+    set_sink(MemoryWriter())
+    analizador = Parser(Lexer(programa + '$', 0, len(programa)), abstract=abstract)
+    raiz, errores = analizador.parser()
+    assert errores == []
+
+    # El nodo de la variable marca el arreglo; el modo abstracto no guarda '[' ni ']'
+    parametro = raiz.child[1].child[1].child[0].child[0].child[1]
+    assert parametro.type == raiz.child[0].child[1].type == "arr"
+    assert [nodo.token for nodo in parametro.child] == \
+        ([] if abstract else [TokenType.BOPEN, TokenType.BCLOSE])
+    assert semantica(raiz, False, analizador.symbols) == error
+
+
+@pytest.mark.parametrize("programa, linea, columna", [
+    ("int x; int f(int a) { return a; }\nint main(void) { x = f(1; return 0; }\n", 2, 25),
+    ("int x[10];\nint main(void) { x[1 = 2; return 0; }\n", 2, 25),
+    ("int x;\nint main(void) { x = 1 return 0; }\n", 2, 24),
+    ("int", 1, 4),
+], ids=["falta-parentesis", "falta-corchete", "falta-punto-y-coma", "solo-tipo"])
+def test_token_obligatorio_faltante(programa, linea, columna):
+    errores, _ = analizar(programa)
+    assert [(error.line, error.column) for error in errores] == [(linea, columna)]
+
+
+def recorrido(raiz):
+    """Funcion para obtener los nodos de un árbol en preorden, para comparar dos árboles
+
+    Args:
+        raiz (TreeNode): Raíz del árbol
+
+    Returns:
+        list: (token, lexema, línea, columna, número de hijos) de cada nodo
+    """
+    nodos = []
+    pila = [raiz]
+    while pila:
+        nodo = pila.pop()
+        hijos = getattr(nodo, "child", None) or []
+        nodos.append((nodo.token, nodo.lexema, nodo.line, nodo.column, len(hijos)))
+        pila.extend(reversed(hijos))
+    return nodos
+
+
+@pytest.mark.parametrize("offset, borrados, insertado", [
+    (7, 0, "$"),
+    (0, 0, "int y; $"),
+], ids=["agrega-fin", "agrega-fin-al-inicio"])
+def test_edicion_con_fin_de_programa(offset, borrados, insertado):
+    programa = "int x;\nint main(void)\n{ return 0; }\n"
+    incremental = IncrementalParser(programa)
+    raiz, errores = incremental.edit(offset, borrados, insertado)
+
+    editado = programa[:offset] + insertado + programa[offset + borrados:]
+    esperado, esperados = Parser(Lexer(editado + '$', 0, len(editado))).parser()
+    assert recorrido(raiz) == recorrido(esperado)
+    assert errores == esperados == []
+
+    # Al borrar el '$' se vuelve a analizar el resto del programa
+    raiz, errores = incremental.edit(offset + insertado.index("$"), 1, "")
+    editado = editado.replace("$", "", 1)
+    esperado, _ = Parser(Lexer(editado + '$', 0, len(editado))).parser()
+    assert recorrido(raiz) == recorrido(esperado)
+    assert errores == []
+
+
+PROGRAMA = """int x;
+int v[10];
+int suma(int a[], int n) {
+    int i; int total;
+    i = 0; total = 0;
+    while (i < n) { total = total + a[i]; i = i + 1; }
+    return total;
+}
+void limpia(int a[]) { int i; i = 0; while (i < 10) { a[i] = 0; i = i + 1; } }
+int main(void) {
+    limpia(v);
+    if (suma(v, 10) == 0) x = 1; else { x = suma(v, x); }
+    return x;
+}
+"""
+
+
+def dibujo(raiz, errores):
+    """Funcion para obtener el dibujo del árbol de print_tree y los errores de sintaxis
+
+    Args:
+        raiz (TreeNode): Raíz del árbol
+        errores (list): ErrorNode del análisis
+
+    Returns:
+        tuple: Texto del árbol y (mensaje, lexema, línea, columna) de cada error
+    """
+    salida = MemoryWriter()
+    set_sink(salida)
+    print_tree(raiz)
+    return salida.getvalue(), [(error.errorMessage, error.lexema, error.line, error.column)
+                               for error in errores]
+
+
+@pytest.mark.parametrize("abstract", [False, True], ids=["concreto", "abstracto"])
+@pytest.mark.parametrize("programa", [
+    PROGRAMA,
+    PROGRAMA.replace("total = total + a[i];", "total = total + a[i]"),
+    PROGRAMA.replace("void limpia(int a[])", "void limpia(int a[]"),
+], ids=["valido", "falta-punto-y-coma", "falta-parentesis"])
+def test_parse_parallel(programa, abstract):
+    set_sink(MemoryWriter())
+    esperado = dibujo(*Parser(Lexer(programa + '$', 0, len(programa)), abstract=abstract).parser())
+    assert esperado[0].count("\n") > 50
+    # Un fragmento por declaración
+    resultado = dibujo(*parse_parallel(tokenize_all(programa), processes=2, chunk_size=1,
+                                       abstract=abstract))
+    assert resultado == esperado
+    assert bool(esperado[1]) == (programa != PROGRAMA)
+
+
+@pytest.mark.parametrize("abstract", [False, True], ids=["concreto", "abstracto"])
+@pytest.mark.parametrize("buscado, reemplazo", [
+    ("i = i + 1; }\n    return", "i = i + 2; }\n    return"),
+    ("total = total + a[i];", "total = total + a[i] * 2; x = total;"),
+    ("if (suma(v, 10) == 0) x = 1;", "x = 1;"),
+    ("void limpia(int a[]) { int i; i = 0; while (i < 10) { a[i] = 0; i = i + 1; } }\n", ""),
+    ("int v[10];\n", ""),
+    ("int main(void)", "int otra(void) { return 0; }\nint main(void)"),
+    ("int x;\n", "int x;\nint y[5];\nvoid nada(void) { }\n"),
+    ("return x;\n}\n", "return x;\n}\nint y;\n"),
+    ("total = total + a[i];", "total = total + a[i]"),
+    ("int suma(int a[], int n) {", "int suma(int a[], int n) { {"),
+], ids=["cuerpo", "cuerpo-crece", "sentencia-borrada", "borra-funcion", "borra-variable",
+        "agrega-funcion", "agrega-al-inicio", "agrega-al-final", "error-en-cuerpo",
+        "llave-abierta"])
+def test_edicion_incremental(buscado, reemplazo, abstract):
+    set_sink(MemoryWriter())
+    incremental = IncrementalParser(PROGRAMA, abstract=abstract)
+    offset = PROGRAMA.index(buscado)
+    raiz, errores = incremental.edit(offset, len(buscado), reemplazo)
+
+    editado = PROGRAMA[:offset] + reemplazo + PROGRAMA[offset + len(buscado):]
+    esperado, esperados = Parser(Lexer(editado + '$', 0, len(editado)),
+                                 abstract=abstract).parser()
+    assert recorrido(raiz) == recorrido(esperado)
+    assert dibujo(raiz, errores) == dibujo(esperado, esperados)
+
+    # Deshacer la edición vuelve al árbol del programa original
+    raiz, errores = incremental.edit(offset, len(reemplazo), buscado)
+    esperado, _ = Parser(Lexer(PROGRAMA + '$', 0, len(PROGRAMA)), abstract=abstract).parser()
+    assert recorrido(raiz) == recorrido(esperado)
+    assert errores == []
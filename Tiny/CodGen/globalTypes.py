@@ -76,6 +76,10 @@ class ExpType(Enum):
 MAXCHILDREN = 3
 
 class TreeNode:
+    # Atributos fijos sin __dict__ por instancia: cada nodo ocupa mucha menos memoria
+    __slots__ = ("child", "sibling", "lineno", "nodekind", "stmt", "exp",
+                 "op", "val", "name", "type")
+
     def __init__(self):
         # MAXCHILDREN = 3 está en globalTypes
         self.child = [None] * MAXCHILDREN # tipo treeNode
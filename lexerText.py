@@ -1,5 +1,10 @@
 from globalTypes import *
 from lexer import *
+from diagnostics import BufferedWriter, set_sink
+
+# La traza de tokens se escribe en la terminal en bloques
+salida = BufferedWriter()
+set_sink(salida)
 
 
 f = open('sample.c-', 'r')
@@ -12,3 +17,5 @@ def_globales(programa, posicion, progLong)
 token, tokenString, lin, col = getToken(True)
 while (token != TokenType.ENDFILE):
     token, tokenString, lin, col = getToken(True)
+
+salida.flush()